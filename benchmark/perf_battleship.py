@@ -0,0 +1,51 @@
+# runcmd: cd .. & venv\Scripts\python benchmark/perf_battleship.py [cnt_games] [board_size ...]
+
+import sys
+import time
+
+from server.py.battleship import Battleship, RandomPlayer, GamePhase
+
+
+def play_games(cnt_games: int, board_size: int) -> None:
+    cnt_turns = 0
+    # per-turn time of the first and of the last quarter of the shots, to see if it grows with the history
+    duration_early = 0.0
+    duration_late = 0.0
+    cnt_early = 0
+    cnt_late = 0
+    time_start = time.perf_counter()
+    for _ in range(cnt_games):
+        game = Battleship(board_size=board_size)
+        player = RandomPlayer()
+        cnt_cells = board_size * board_size
+        while game.get_state().phase != GamePhase.FINISHED:
+            time_turn = time.perf_counter()
+            state = game.get_state()
+            action = player.select_action(game.get_player_view(state.idx_player_active), game.get_list_action())
+            if action is None:
+                break
+            game.apply_action(action)
+            duration = time.perf_counter() - time_turn
+            cnt_turns += 1
+            cnt_shots = len(state.players[state.idx_player_active].shots)
+            if state.phase == GamePhase.RUNNING and 0 < cnt_shots <= cnt_cells // 4:
+                duration_early += duration
+                cnt_early += 1
+            elif cnt_shots > 3 * cnt_cells // 4:
+                duration_late += duration
+                cnt_late += 1
+    duration = time.perf_counter() - time_start
+
+    print(f'--- Battleship {board_size}x{board_size} ---')
+    print(f'Games:          {cnt_games}, {cnt_turns} turns ({cnt_turns / duration:.0f}/s)')
+    if cnt_early:
+        print(f'Early turns:    {cnt_early} ({1e6 * duration_early / cnt_early:.0f} us/turn)')
+    if cnt_late:
+        print(f'Late turns:     {cnt_late} ({1e6 * duration_late / cnt_late:.0f} us/turn)')
+
+
+if __name__ == '__main__':
+
+    cnt = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for size in [int(arg) for arg in sys.argv[2:]] or [10, 30, 60]:
+        play_games(cnt, size)
@@ -0,0 +1,44 @@
+# runcmd: cd .. & venv\Scripts\python benchmark/perf_dog.py [cnt_games] [cnt_turns]
+
+import sys
+import time
+
+from server.py.dog import Dog, RandomPlayer, GamePhase
+
+
+def play_games(cnt_games: int, cnt_turns: int) -> None:
+    cnt_calls = 0
+    cnt_applied = 0
+    stats = {'list_hit': 0, 'list_miss': 0, 'card_hit': 0, 'card_miss': 0}
+    time_start = time.perf_counter()
+    for idx_game in range(cnt_games):
+        game = Dog(seed=idx_game)
+        player = RandomPlayer(seed=idx_game)
+        for _ in range(cnt_turns):
+            if game.get_state().phase == GamePhase.FINISHED:
+                break
+            # like the game server: list the actions, then let the player select from a fresh list
+            game.get_list_action()
+            action = player.select_action(game.get_player_view(game.get_state().idx_player_active), game.get_list_action())
+            game.apply_action(action)
+            cnt_calls += 2
+            cnt_applied += 1
+        for key, value in game.cache_stats.items():
+            stats[key] += value
+    duration = time.perf_counter() - time_start
+
+    print('--- Dog performance ---')
+    print(f'Games:             {cnt_games} x {cnt_turns} turns')
+    print(f'Actions applied:   {cnt_applied} ({cnt_applied / duration:.0f}/s)')
+    print(f'get_list_action:   {cnt_calls} calls')
+    for name in ['list', 'card']:
+        cnt_total = stats[f'{name}_hit'] + stats[f'{name}_miss']
+        rate = stats[f'{name}_hit'] / cnt_total if cnt_total else 0.0
+        print(f'Cache {name + ":":<12} {stats[name + "_hit"]}/{cnt_total} hits ({rate:.1%})')
+
+
+if __name__ == '__main__':
+
+    play_games(
+        cnt_games=int(sys.argv[1]) if len(sys.argv) > 1 else 20,
+        cnt_turns=int(sys.argv[2]) if len(sys.argv) > 2 else 500)
@@ -0,0 +1,146 @@
+# runcmd: cd .. & venv\Scripts\python benchmark/selfplay.py dog.Dog --games 1000 --workers 8
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import importlib
+import inspect
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+# (winner or None if unfinished/lost, turns played)
+GameResult = Tuple[Optional[int], int]
+
+HANGMAN_WORDS = ['DEVOPS', 'PYTHON', 'DOCKER', 'BENCHMARK', 'PYDANTIC']
+
+
+def setup_hangman(game: Any, module: Any, rng: random.Random) -> None:
+    path = Path(module.__file__).with_name('hangman_words.json')
+    words = HANGMAN_WORDS
+    if path.is_file():
+        with open(path, encoding='utf-8') as fin:
+            words = json.load(fin)
+    game.set_state(module.HangmanGameState(word_to_guess=rng.choice(words), phase=module.GamePhase.RUNNING))
+
+
+def get_winner_dog(game: Any) -> Optional[int]:
+    """ Winning team: 0 for players 1 and 3, 1 for players 2 and 4 """
+    return 0 if game.team_finished([0, 2]) else 1
+
+
+def get_winner_battleship(game: Any) -> Optional[int]:
+    winner: Optional[int] = game.get_state().winner
+    return winner
+
+
+def get_winner_hangman(game: Any) -> Optional[int]:
+    state = game.get_state()
+    return 0 if set(state.word_to_guess) <= set(state.guesses) else None
+
+
+# per game module: preparation of a new game and winner of a finished one
+SETUP: Dict[str, Callable[[Any, Any, random.Random], None]] = {'hangman': setup_hangman}
+WINNER: Dict[str, Callable[[Any], Optional[int]]] = {
+    'dog': get_winner_dog, 'battleship': get_winner_battleship, 'hangman': get_winner_hangman}
+# players per game, every seat gets its own player instance
+SEATS: Dict[str, int] = {'dog': 4, 'battleship': 2, 'hangman': 1}
+
+
+def load_class(spec: str) -> Tuple[Any, Any]:
+    """ Module and class for a spec like 'dog.Dog' or 'battleship.NotSoRandomPlayer' """
+    module_name, class_name = spec.split('.')
+    module = importlib.import_module(f'server.py.{module_name}')
+    return module, getattr(module, class_name)
+
+
+def create(cls: Any, seed: int) -> Any:
+    """ Instance of a game or player class, seeded if its constructor takes a seed """
+    if 'seed' in inspect.signature(cls).parameters:
+        return cls(seed=seed)
+    return cls()
+
+
+def play_games(spec: str, player_specs: List[str], seeds: List[int], max_turns: int) -> List[GameResult]:
+    """ Play one game per seed in this process """
+    module, game_class = load_class(spec)
+    module_name = spec.split('.')[0]
+    player_classes = [load_class(player_spec)[1] for player_spec in player_specs]
+    results = []
+    for seed in seeds:
+        # the example games use the global random module; every worker process has its own
+        random.seed(seed)
+        rng = random.Random(seed)
+        game = create(game_class, seed)
+        if module_name in SETUP:
+            SETUP[module_name](game, module, rng)
+        cnt_seats = SEATS[module_name]
+        players = [
+            create(player_classes[i % len(player_classes)], seed * cnt_seats + i) for i in range(cnt_seats)]
+
+        cnt_turns = 0
+        while cnt_turns < max_turns:
+            state = game.get_state()
+            if state.phase == module.GamePhase.FINISHED:
+                break
+            idx_player = getattr(state, 'idx_player_active', 0)
+            player = players[idx_player]
+            action = player.select_action(game.get_player_view(idx_player), game.get_list_action())
+            game.apply_action(action)
+            cnt_turns += 1
+
+        winner = None
+        if game.get_state().phase == module.GamePhase.FINISHED:
+            winner = WINNER[module_name](game)
+        results.append((winner, cnt_turns))
+    return results
+
+
+def run(spec: str, player_specs: List[str], cnt_games: int, cnt_workers: int,
+        seed: int, chunk_size: int, max_turns: int) -> None:
+    seeds = list(range(seed, seed + cnt_games))
+    chunks = [seeds[i:i + chunk_size] for i in range(0, cnt_games, chunk_size)]
+
+    print('--- Self-play ---')
+    print(f'Game:    {spec}')
+    print(f'Players: {", ".join(player_specs)}')
+    print(f'Games:   {cnt_games} on {cnt_workers} workers, seeds {seed}..{seed + cnt_games - 1}')
+    print()
+
+    wins: Dict[Optional[int], int] = {}
+    lengths: List[int] = []
+    time_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=cnt_workers) as executor:
+        futures = [executor.submit(play_games, spec, player_specs, chunk, max_turns) for chunk in chunks]
+        for future in as_completed(futures):
+            for winner, cnt_turns in future.result():
+                wins[winner] = wins.get(winner, 0) + 1
+                lengths.append(cnt_turns)
+            duration = time.perf_counter() - time_start
+            rates = ' '.join(
+                f'{winner}: {wins[winner] / len(lengths):.1%}' for winner in sorted(w for w in wins if w is not None))
+            print(f'{len(lengths):>6}/{cnt_games} games | wins {rates or "-"} | '
+                  f'no winner {wins.get(None, 0)} | '
+                  f'turns mean {sum(lengths) / len(lengths):.1f} max {max(lengths)} | '
+                  f'{sum(lengths) / duration:.0f} turns/s')
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Play many games with the given players on all cores')
+    parser.add_argument('game', help="game class, e.g. 'dog.Dog'")
+    parser.add_argument('--player', action='append',
+                        help="player class per seat (repeated round-robin), default: the game module's RandomPlayer")
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--chunk', type=int, default=10, help='games per task sent to a worker')
+    parser.add_argument('--max-turns', type=int, default=5000, help='games still running after this count as no winner')
+    args = parser.parse_args()
+
+    run(spec=args.game,
+        player_specs=args.player or [f'{args.game.split(".")[0]}.RandomPlayer'],
+        cnt_games=args.games, cnt_workers=args.workers, seed=args.seed,
+        chunk_size=args.chunk, max_turns=args.max_turns)
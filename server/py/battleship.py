@@ -1,13 +1,15 @@
-
 # Example solution to check docker and main.py thingies 
 
-from typing import List, Optional, Dict
+from typing import Any, List, Optional, Dict, Sequence, Iterable, NamedTuple, Tuple
+import bisect
 import random
 import string
 from enum import Enum
-from pydantic import BaseModel
+import numpy as np
+import numpy.typing as npt
+from pydantic import BaseModel, Field
 from colorama import init, Fore, Back, Style # type: ignore
-from server.py.game import Game, Player
+from server.py.game import Game, Player, LazyActions
 
 init(convert=True)
 
@@ -30,18 +32,110 @@ class Ship(BaseModel):
 
 
 
+BOARD_SIZE = 10
+FLEET = (('carrier', 5), ('battleship', 4), ('cruiser', 3), ('submarine', 3), ('destroyer', 2))
+
+
+def get_ship_data(ship: Ship) -> Dict[str, Any]:
+    return {'name': ship.name, 'length': ship.length, 'location': ship.location}
+
+
 class PlayerState(BaseModel):
     name: str
-    ships: List[Ship] = [
-        Ship(name="carrier", length=5),
-        Ship(name="battleship", length=4),
-        Ship(name="cruiser", length=3),
-        Ship(name="submarine", length=3),
-        Ship(name="destroyer", length=2),
-    ]
-    shots: List[str] = []
-    successful_shots: List[str] = []
-
+    ships: List[Ship] = Field(
+        default_factory=lambda: [Ship(name=name, length=length) for name, length in FLEET])
+    shots: List[str] = Field(default_factory=list)
+    successful_shots: List[str] = Field(default_factory=list)
+
+
+def get_column_name(idx_column: int) -> str:
+    """ Column names like in a spreadsheet: A to Z, then AA, AB, ... """
+    name = ''
+    idx_column += 1
+    while idx_column > 0:
+        idx_column, rest = divmod(idx_column - 1, 26)
+        name = string.ascii_uppercase[rest] + name
+    return name
+
+
+def get_cell_index(location: str, board_size: int = BOARD_SIZE) -> int:
+    """ Bit of a cell like 'C7' in the bitboards: column-major, 'A1' is bit 0 """
+    letters = location.rstrip(string.digits)
+    idx_column = 0
+    for letter in letters:
+        idx_column = idx_column * 26 + ord(letter) - ord('A') + 1
+    return (idx_column - 1) * board_size + int(location[len(letters):]) - 1
+
+
+def get_cell_name(index: int, board_size: int = BOARD_SIZE) -> str:
+    return get_column_name(index // board_size) + str(index % board_size + 1)
+
+
+def get_locations_mask(locations: Iterable[str], board_size: int = BOARD_SIZE) -> int:
+    mask = 0
+    for location in locations:
+        mask |= 1 << get_cell_index(location, board_size)
+    return mask
+
+
+class FreeCells:  # pylint: disable=too-few-public-methods
+    """ Cells not shot at yet: cells[:cnt] (in any order),
+    pos[cell] is the index of a cell in cells """
+
+    def __init__(self, cnt_cells: int, shots: int) -> None:
+        self.cells = list(range(cnt_cells))
+        self.pos = list(range(cnt_cells))
+        self.cnt = cnt_cells
+        if shots:
+            self.cells = [k for k in range(cnt_cells) if not shots >> k & 1]
+            self.cnt = len(self.cells)
+            self.cells += [k for k in range(cnt_cells) if shots >> k & 1]
+            for pos, idx_cell in enumerate(self.cells):
+                self.pos[idx_cell] = pos
+
+    def remove(self, idx_cell: int) -> None:
+        """ Swap the cell behind the free ones; the free cells stay a prefix of cells """
+        pos = self.pos[idx_cell]
+        if pos >= self.cnt:
+            return
+        self.cnt -= 1
+        idx_last = self.cells[self.cnt]
+        self.cells[pos], self.cells[self.cnt] = idx_last, idx_cell
+        self.pos[idx_last], self.pos[idx_cell] = pos, self.cnt
+
+
+class PlayerBoard:
+    """ Bitboards (Python ints, one bit per cell) of a player's ships, shots and hits """
+
+    def __init__(self, player: PlayerState, board_size: int = BOARD_SIZE) -> None:
+        self.ship_masks = [
+            0 if ship.location is None else get_locations_mask(ship.location, board_size)
+            for ship in player.ships]
+        self.ships = 0
+        for mask in self.ship_masks:
+            self.ships |= mask
+        self.shots = get_locations_mask(player.shots, board_size)
+        self.hits = get_locations_mask(player.successful_shots, board_size)
+        # hits the opponent scored on each ship and the indices of the sunk ships, in ship order
+        self.ship_hits: List[int] = [0] * len(self.ship_masks)
+        self.sunk: List[int] = []
+        self.free = FreeCells(board_size * board_size, self.shots)
+
+    def count_hits(self, player: PlayerState, hits: int) -> None:
+        """ Recount the opponent's hits on every ship """
+        self.ship_hits = [(mask & hits).bit_count() for mask in self.ship_masks]
+        self.sunk = [
+            k for k, (ship, mask) in enumerate(zip(player.ships, self.ship_masks))
+            if ship.location is not None and mask & ~hits == 0]
+
+    def add_hits(self, new_hits: int) -> None:
+        """ Count hits on cells not hit before; a ship with all cells hit joins sunk """
+        for k, mask in enumerate(self.ship_masks):
+            cnt = (mask & new_hits).bit_count()
+            if cnt:
+                self.ship_hits[k] += cnt
+                if self.ship_hits[k] == mask.bit_count():
+                    bisect.insort(self.sunk, k)
 
 
 class GamePhase(str, Enum):
@@ -51,10 +145,13 @@ class GamePhase(str, Enum):
 
 
 class BattleshipGameState(BaseModel):
-    idx_player_active: int = random.choice([0, 1])
+    idx_player_active: int = Field(default_factory=lambda: random.choice([0, 1]))
     phase: GamePhase = GamePhase.SETUP
     winner: Optional[int] = None
-    players: List[PlayerState] = [PlayerState(name='Player1'), PlayerState(name='Player2')]
+    players: List[PlayerState] = Field(
+        default_factory=lambda: [PlayerState(name='Player1'), PlayerState(name='Player2')])
+    board_size: int = BOARD_SIZE
+    cnt_ships: int = len(FLEET)  # ships each player sets before the shooting starts
 
     def all_ships_located(self) -> bool:
         for ship in self.players[self.idx_player_active].ships:
@@ -76,74 +173,122 @@ class BattleshipGameState(BaseModel):
             idx_player = (self.idx_player_active + 1) % 2
         return self.players[idx_player].shots
 
-    def check_if_finished(self) -> bool:
+    def get_boards(self) -> List[PlayerBoard]:
+        boards = [PlayerBoard(player, self.board_size) for player in self.players]
+        for board, player, opponent in zip(boards, self.players, reversed(boards)):
+            board.count_hits(player, opponent.hits)
+        return boards
+
+    def check_if_finished(self, boards: Optional[List[PlayerBoard]] = None) -> bool:
         # Does the opponent player still have some ships left?
         if not self.all_ships_located():
             return False
-        shots = set(self.players[self.idx_player_active].shots)
-        for ship in self.players[(self.idx_player_active + 1) % 2].ships:
-            if ship.location is not None:
-                if len(set(ship.location).difference(shots)) > 0:
-                    return False
-        return True
-
-    def apply_action(self, action: BattleshipAction) -> None:
+        if boards is None:
+            boards = self.get_boards()
+        opponent = boards[(self.idx_player_active + 1) % 2]
+        return opponent.ships & ~boards[self.idx_player_active].shots == 0
+
+    def apply_action(self, action: BattleshipAction,
+                     boards: Optional[List[PlayerBoard]] = None) -> None:
+        """ Apply the action; boards (as from get_boards) are updated along with the lists """
+        if boards is None:
+            boards = self.get_boards()
         if action.action_type == 'set_ship':
-            existing_ship = False
-            for ship in self.get_player_ships(active_player=True):
-                if ship.name == action.ship_name:
-                    ship.location = action.location.copy()
-                    existing_ship = True
-                    break
-            if not existing_ship:
-                new_ship = Ship(
-                    name=action.ship_name if action.ship_name is not None else 'ship',
-                    length=len(action.location),
-                    location=action.location)
-                self.get_player_ships(active_player=True).append(new_ship)
-            # test if both player have set all ship locations -> phase = running
-            all_ships_located = True
-            for player in self.players:
-                for ship in player.ships:
-                    all_ships_located = all_ships_located and ship.location is not None
-                if len(player.ships) < 5:
-                    all_ships_located = False
-            if all_ships_located:
-                self.phase = GamePhase.RUNNING
+            self.apply_set_ship(action, boards)
         else:
-            self.players[self.idx_player_active].shots.extend(action.location)
-            opponent_ship_locations = [
-                loc for ship in self.get_player_ships(False) if ship.location is not None for loc in ship.location]
-            if action.location[0] in opponent_ship_locations:
-                self.players[self.idx_player_active].successful_shots.extend(action.location)
-        if self.check_if_finished():
+            self.apply_shot(action, boards)
+        if self.check_if_finished(boards):
             self.phase = GamePhase.FINISHED
             self.winner = self.idx_player_active
         else:
             self.idx_player_active = (self.idx_player_active + 1) % 2
 
-    def get_masked_state(self, idx_player: int) -> "BattleshipGameState":
+    def apply_set_ship(self, action: BattleshipAction, boards: List[PlayerBoard]) -> None:
+        board = boards[self.idx_player_active]
+        existing_ship = False
+        mask = get_locations_mask(action.location, self.board_size)
+        for k, ship in enumerate(self.get_player_ships(active_player=True)):
+            if ship.name == action.ship_name:
+                ship.location = action.location.copy()
+                board.ship_masks[k] = mask
+                existing_ship = True
+                break
+        if not existing_ship:
+            new_ship = Ship(
+                name=action.ship_name if action.ship_name is not None else 'ship',
+                length=len(action.location),
+                location=action.location)
+            self.get_player_ships(active_player=True).append(new_ship)
+            board.ship_masks.append(mask)
+        board.ships = 0
+        for ship_mask in board.ship_masks:
+            board.ships |= ship_mask
+        board.count_hits(
+            self.players[self.idx_player_active], boards[(self.idx_player_active + 1) % 2].hits)
+        # test if both player have set all ship locations -> phase = running
+        all_ships_located = True
+        for player in self.players:
+            for ship in player.ships:
+                all_ships_located = all_ships_located and ship.location is not None
+            if len(player.ships) < self.cnt_ships:
+                all_ships_located = False
+        if all_ships_located:
+            self.phase = GamePhase.RUNNING
+
+    def apply_shot(self, action: BattleshipAction, boards: List[PlayerBoard]) -> None:
+        board = boards[self.idx_player_active]
+        self.players[self.idx_player_active].shots.extend(action.location)
+        mask = get_locations_mask(action.location, self.board_size)
+        board.shots |= mask
+        for location in action.location:
+            board.free.remove(get_cell_index(location, self.board_size))
+        target = boards[(self.idx_player_active + 1) % 2]
+        if target.ships >> get_cell_index(action.location[0], self.board_size) & 1:
+            self.players[self.idx_player_active].successful_shots.extend(action.location)
+            target.add_hits(mask & ~board.hits)
+            board.hits |= mask
+
+    def get_masked_state(self, idx_player: int,
+                         boards: Optional[List[PlayerBoard]] = None) -> "BattleshipGameState":
+        if boards is None:
+            boards = self.get_boards()
         other_player = (idx_player + 1) % 2
-        masked_state = BattleshipGameState()
-        masked_state.idx_player_active = self.idx_player_active
-        masked_state.winner = self.winner
-        masked_state.phase = self.phase
-        masked_state.players[idx_player] = self.players[idx_player]
-        masked_state.players[other_player].shots = self.players[other_player].shots
-        masked_state.players[other_player].successful_shots = self.players[other_player].successful_shots
-
-        # show ships that were sunk
-        masked_state.players[other_player].ships = []
-        for ship in self.players[other_player].ships:
-            if ship.location is not None:
-                cnt = 0
-                for shot in self.players[idx_player].successful_shots:
-                    if shot in ship.location:
-                        cnt += 1
-                if cnt == len(ship.location):
-                    masked_state.players[other_player].ships.append(ship)
-
-        return masked_state
+        me = self.players[idx_player]
+        other = self.players[other_player]
+        # plain data, validating it copies every list, so the view shares nothing with the state
+        players = [
+            {'name': me.name, 'ships': [get_ship_data(ship) for ship in me.ships],
+             'shots': me.shots, 'successful_shots': me.successful_shots},
+            # of the opponent only the shots and the ships that were sunk
+            {'name': f'Player{other_player + 1}',
+             'ships': [get_ship_data(other.ships[k]) for k in boards[other_player].sunk],
+             'shots': other.shots, 'successful_shots': other.successful_shots}]
+        if idx_player == 1:
+            players.reverse()
+        return BattleshipGameState.model_validate({
+            'idx_player_active': self.idx_player_active, 'phase': self.phase, 'winner': self.winner,
+            'players': players, 'board_size': self.board_size, 'cnt_ships': self.cnt_ships})
+
+
+# new game states as plain data, by board size and fleet
+STATE_TEMPLATES: Dict[Tuple[int, Tuple[Tuple[str, int], ...]], Dict[str, Any]] = {}
+
+
+def create_state(board_size: int = BOARD_SIZE,
+                 fleet: Sequence[Tuple[str, int]] = FLEET) -> BattleshipGameState:
+    """ New game in the setup phase, validated from a cached template (which copies all of it) """
+    key = (board_size, tuple(fleet))
+    template = STATE_TEMPLATES.get(key)
+    if template is None:
+        players = [
+            PlayerState(name=f'Player{k + 1}',
+                        ships=[Ship(name=name, length=length) for name, length in fleet])
+            for k in range(2)]
+        template = STATE_TEMPLATES[key] = BattleshipGameState(
+            idx_player_active=0, board_size=board_size, cnt_ships=len(fleet),
+            players=players).model_dump()
+    return BattleshipGameState.model_validate(
+        dict(template, idx_player_active=random.choice([0, 1])))
 
 
 def get_possible_locations(ship_length: int, board_size: int) -> List[List[str]]:
@@ -151,7 +296,7 @@ def get_possible_locations(ship_length: int, board_size: int) -> List[List[str]]
         raise ValueError('Ship length has to be positive')
     if ship_length > board_size:
         raise ValueError(f"Ship of length {ship_length} is too large for board size {board_size}")
-    x_names = list(string.ascii_uppercase)[:board_size]
+    x_names = [get_column_name(x) for x in range(board_size)]
     y_names = [str(y) for y in range(1, board_size + 1)]
     options = []
     # horizontal locations
@@ -167,22 +312,261 @@ def get_possible_locations(ship_length: int, board_size: int) -> List[List[str]]
     return options
 
 
+class Placements(NamedTuple):
+    """ All positions of a ship of one length as locations and bitmasks,
+    shared read-only by all games """
+    locations: Tuple[Tuple[str, ...], ...]
+    masks: Tuple[int, ...]
+
+
+# (ship length, board size) -> placements, filled on first use
+PLACEMENTS: Dict[Tuple[int, int], Placements] = {}
+
+
+def get_placements(length: int, board_size: int = BOARD_SIZE) -> Placements:
+    key = (length, board_size)
+    placements = PLACEMENTS.get(key)
+    if placements is None:
+        locations = tuple(tuple(loc) for loc in get_possible_locations(length, board_size))
+        masks = tuple(get_locations_mask(loc, board_size) for loc in locations)
+        placements = PLACEMENTS[key] = Placements(locations, masks)
+    return placements
+
+
+def sample_placement(placements: Placements, busy: int, rng: random.Random,
+                     max_tries: int = 32) -> Optional[int]:
+    """ Index of a uniformly random placement not overlapping busy, None if there is none """
+    masks = placements.masks
+    for _ in range(max_tries):
+        idx = rng.randrange(len(masks))
+        if masks[idx] & busy == 0:
+            return idx
+    free = [k for k, mask in enumerate(masks) if mask & busy == 0]
+    return rng.choice(free) if free else None
+
+
+def sample_fleet(lengths: Sequence[int], rng: random.Random, board_size: int = BOARD_SIZE,
+                 busy_start: int = 0, max_tries: int = 1000) -> Optional[List[Tuple[str, ...]]]:
+    """ Locations of ships that overlap neither each other nor busy_start,
+    uniform over all such layouts (a layout with an overlap is drawn again);
+    None if the ships don't fit """
+    tables = [get_placements(length, board_size) for length in lengths]
+    for _ in range(max_tries):
+        busy = busy_start
+        layout = []
+        for table in tables:
+            k = rng.randrange(len(table.masks))
+            if table.masks[k] & busy:
+                break
+            busy |= table.masks[k]
+            layout.append(table.locations[k])
+        else:
+            return layout
+    # crowded board: place ship by ship instead (not exactly uniform)
+    busy = busy_start
+    layout = []
+    for table in tables:
+        idx = sample_placement(table, busy, rng)
+        if idx is None:
+            return None
+        busy |= table.masks[idx]
+        layout.append(table.locations[idx])
+    return layout
+
+
+# (ship length, board size) -> (placement, cell) matrix, rows in the order of get_placements
+PLACEMENT_MATRICES: Dict[Tuple[int, int], npt.NDArray[np.bool_]] = {}
+# (length a, length b, board size) -> (placement a, placement b) matrix,
+# True where the two placements share a cell
+OVERLAP_MATRICES: Dict[Tuple[int, int, int], npt.NDArray[np.bool_]] = {}
+
+
+def get_placement_matrix(length: int, board_size: int = BOARD_SIZE) -> npt.NDArray[np.bool_]:
+    """ Placements of a ship as rows of a read-only (placement, cell) matrix,
+    cells ordered by their bit """
+    key = (length, board_size)
+    matrix = PLACEMENT_MATRICES.get(key)
+    if matrix is None:
+        if not 0 < length <= board_size:
+            raise ValueError(
+                f"Ship of length {length} doesn't fit on a board of size {board_size}")
+        steps = np.arange(length)
+        # horizontal: start column outer, row inner; vertical: start row outer, column inner
+        starts, lines = np.meshgrid(
+            np.arange(board_size - length + 1), np.arange(board_size), indexing='ij')
+        starts = starts.ravel()[:, None]
+        lines = lines.ravel()[:, None]
+        cells = (starts + steps) * board_size + lines
+        if length > 1:
+            cells = np.concatenate([cells, lines * board_size + starts + steps])
+        matrix = np.zeros((len(cells), board_size * board_size), dtype=np.bool_)
+        matrix[np.arange(len(cells))[:, None], cells] = True
+        matrix.setflags(write=False)
+        PLACEMENT_MATRICES[key] = matrix
+    return matrix
+
+
+def get_overlap_matrix(length_a: int, length_b: int,
+                       board_size: int = BOARD_SIZE) -> npt.NDArray[np.bool_]:
+    key = (length_a, length_b, board_size)
+    overlap = OVERLAP_MATRICES.get(key)
+    if overlap is None:
+        matrix_a = get_placement_matrix(length_a, board_size).astype(np.float32)
+        matrix_b = get_placement_matrix(length_b, board_size).astype(np.float32)
+        overlap = matrix_a @ matrix_b.T > 0
+        overlap.setflags(write=False)
+        OVERLAP_MATRICES[key] = overlap
+    return overlap
+
+
+def get_free_placements(length: int, board_size: int, busy: int) -> npt.NDArray[np.bool_]:
+    """ Placements not covering any cell of the bitmask busy """
+    cells = [k for k in range(board_size * board_size) if busy >> k & 1]
+    return np.logical_not(get_placement_matrix(length, board_size)[:, cells].any(axis=1))
+
+
+def count_fleet_layouts(lengths: Sequence[int], board_size: int = BOARD_SIZE, busy: int = 0,
+                        chunk_size: int = 4096) -> int:
+    """ Number of ways to place ships of the given lengths without overlaps and outside busy
+    (ships are told apart, like the named ships of a fleet) """
+    if not lengths:
+        return 1
+    lengths = sorted(lengths, reverse=True)
+    # every row: the placements each of the remaining ships may still take,
+    # after the ships before it are set
+    allowed = [get_free_placements(length, board_size, busy).astype(np.float32)[None, :]
+               for length in lengths]
+    return round(count_rows(lengths, allowed, board_size, chunk_size))
+
+
+def count_rows(lengths: Sequence[int], allowed: List[npt.NDArray[np.float32]], board_size: int,
+               chunk_size: int) -> float:
+    if len(lengths) == 1:
+        return float(allowed[0].sum(dtype=np.float64))
+    if len(lengths) == 2:
+        free = 1.0 - get_overlap_matrix(lengths[0], lengths[1], board_size).astype(np.float32)
+        return float(((allowed[0] @ free) * allowed[1]).sum(dtype=np.float64))
+    # set the first ship in every allowed way, one row per (row, placement),
+    # in chunks to bound the memory
+    rows, placements = np.nonzero(allowed[0])
+    compatible = [~get_overlap_matrix(lengths[0], length, board_size) for length in lengths[1:]]
+    total = 0.0
+    for start in range(0, len(rows), chunk_size):
+        chunk_rows = rows[start:start + chunk_size]
+        chunk_placements = placements[start:start + chunk_size]
+        chunk_allowed = [a[chunk_rows] * c[chunk_placements]
+                         for a, c in zip(allowed[1:], compatible)]
+        total += count_rows(lengths[1:], chunk_allowed, board_size, chunk_size)
+    return total
+
+
+# redraws of the overlapping layouts before sample_fleets gives up on them
+MAX_SAMPLE_ROUNDS = 1000
+
+
+def sample_fleets(lengths: Sequence[int], cnt: int, rng: np.random.Generator,
+                  board_size: int = BOARD_SIZE, busy: int = 0) -> npt.NDArray[np.int64]:
+    """ Placement indices (fleet, ship) of cnt layouts,
+    each uniform over all layouts without overlaps and outside busy;
+    rows still overlapping after MAX_SAMPLE_ROUNDS of redrawing are -1 """
+    tables = [np.flatnonzero(get_free_placements(length, board_size, busy)) for length in lengths]
+    if any(len(table) == 0 for table in tables):
+        return np.full((cnt, len(lengths)), -1, dtype=np.int64)
+    fleets = np.full((cnt, len(lengths)), -1, dtype=np.int64)
+    pending = np.arange(cnt)
+    for _ in range(MAX_SAMPLE_ROUNDS):
+        if len(pending) == 0:
+            break
+        draws = np.stack(
+            [table[rng.integers(len(table), size=len(pending))] for table in tables], axis=1)
+        valid = np.ones(len(pending), dtype=np.bool_)
+        for a, length_a in enumerate(lengths):
+            for b in range(a + 1, len(lengths)):
+                overlap = get_overlap_matrix(length_a, lengths[b], board_size)
+                valid &= ~overlap[draws[:, a], draws[:, b]]
+        fleets[pending[valid]] = draws[valid]
+        pending = pending[~valid]
+    return fleets
+
+
+class ShipActions(LazyActions[BattleshipAction]):
+    """ Placements of a ship that don't overlap the placed ones,
+    built as actions only when accessed """
+
+    def __init__(self, ship_name: str, placements: Placements, busy: int) -> None:
+        self.ship_name = ship_name
+        self.placements = placements
+        self.busy = busy
+        self.indices = [i for i, mask in enumerate(placements.masks) if mask & busy == 0]
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def get_action(self, index: int) -> BattleshipAction:
+        return self.build_action(self.indices[index])
+
+    def build_action(self, idx_placement: int) -> BattleshipAction:
+        return BattleshipAction(
+            action_type=ActionType.SET_SHIP, ship_name=self.ship_name,
+            location=list(self.placements.locations[idx_placement]))
+
+    def sample(self, rng: random.Random) -> Optional[BattleshipAction]:
+        """ Uniformly random action, drawn by rejection on the bitmasks """
+        idx = sample_placement(self.placements, self.busy, rng)
+        return None if idx is None else self.build_action(idx)
+
+
+class ShootActions(LazyActions[BattleshipAction]):
+    """ Shots at the free cells of a board, built as actions only when accessed """
+
+    def __init__(self, board: PlayerBoard, cell_names: Sequence[str]) -> None:
+        # later shots only reorder the first cnt free cells of the board's list,
+        # so the actions stay the same
+        self.cells = board.free.cells
+        self.cnt = board.free.cnt
+        self.cell_names = cell_names
+
+    def __len__(self) -> int:
+        return self.cnt
+
+    def get_action(self, index: int) -> BattleshipAction:
+        return BattleshipAction(
+            action_type=ActionType.SHOOT, location=[self.cell_names[self.cells[index]]])
+
+    def sample(self, rng: random.Random) -> Optional[BattleshipAction]:
+        return self.get_action(rng.randrange(self.cnt)) if self.cnt > 0 else None
+
+
+CELL_NAMES: Dict[int, Tuple[str, ...]] = {}
+
+
+def get_cell_names(board_size: int = BOARD_SIZE) -> Tuple[str, ...]:
+    """ Names of all cells, ordered by their bit """
+    names = CELL_NAMES.get(board_size)
+    if names is None:
+        names = CELL_NAMES[board_size] = tuple(
+            loc[0] for loc in get_placements(1, board_size).locations)
+    return names
+
+
 def print_player_board(ships: List[Ship], enemy_shots: List[str], board_size: int = 10) -> None:
-    x_coords = list(string.ascii_uppercase)[:board_size]
+    x_coords = [get_column_name(x) for x in range(board_size)]
     y_coords = [str(y) for y in range(1, board_size + 1)]
-    print("   " + "  ".join(x_coords) + " ")
-    ship_locations = [loc for ship in ships if ship.location is not None for loc in ship.location]
+    width = max(2, len(y_coords[-1]))
+    print(" " * width + "".join(f"{x_coord:^3}" for x_coord in x_coords))
+    ship_locations = {loc for ship in ships if ship.location is not None for loc in ship.location}
+    shot_locations = set(enemy_shots)
     for y_coord in y_coords:
-        y_string = f"{y_coord:>2}"
+        y_string = f"{y_coord:>{width}}"
         for x_coord in x_coords:
             coordinate = x_coord + y_coord
             if coordinate in ship_locations:
-                if coordinate in enemy_shots:
+                if coordinate in shot_locations:
                     y_string += Fore.RED + Back.WHITE + Style.BRIGHT + " X " + Style.RESET_ALL
                 else:
                     y_string += Back.WHITE + " S " + Style.RESET_ALL
             else:
-                if coordinate in enemy_shots:
+                if coordinate in shot_locations:
                     y_string += Fore.CYAN + " O " + Style.RESET_ALL
                 else:
                     y_string += " - "
@@ -191,21 +575,29 @@ def print_player_board(ships: List[Ship], enemy_shots: List[str], board_size: in
 
 class Battleship(Game):
 
-    def __init__(self) -> None:
-        self.state = BattleshipGameState()
-        self.ship_locations: Dict[int, List[List[str]]] = {
-            2: get_possible_locations(2, 10),
-            3: get_possible_locations(3, 10),
-            4: get_possible_locations(4, 10),
-            5: get_possible_locations(5, 10)
-        }
-        self.shoot_locations: List[str] = [loc[0] for loc in get_possible_locations(1, 10)]
+    def __init__(self, board_size: int = BOARD_SIZE,
+                 fleet: Sequence[Tuple[str, int]] = FLEET) -> None:
+        """ Board of board_size x board_size cells (columns A to Z, then AA, ...),
+        each player sets the ships of fleet, given as (name, length) """
+        for name, length in fleet:
+            if not 0 < length <= board_size:
+                raise ValueError(f"Ship '{name}' of length {length} doesn't fit "
+                                 f"on a board of size {board_size}")
+        self.board_size = board_size
+        self.state = create_state(board_size, fleet)
+        self.shoot_locations = get_cell_names(board_size)
+        # bitboards of both players, kept in sync by apply_action;
+        # callers that edit the object from get_state() must hand it back through set_state()
+        self.boards = self.state.get_boards()
 
     def get_state(self) -> BattleshipGameState:
         return self.state
 
     def set_state(self, state: BattleshipGameState) -> None:
         self.state = state
+        self.board_size = state.board_size
+        self.shoot_locations = get_cell_names(state.board_size)
+        self.boards = state.get_boards()
 
     def print_state(self) -> None:
         #for idx in [0, 1]:
@@ -217,31 +609,35 @@ class Battleship(Game):
                 print(Fore.YELLOW + "Your turn!" + Style.RESET_ALL)
             print_player_board(
                 ships=self.state.players[idx].ships,
-                enemy_shots=self.state.players[(idx + 1) % 2].shots
+                enemy_shots=self.state.players[(idx + 1) % 2].shots,
+                board_size=self.board_size
                 )
             print("--------------------------------\n")
 
-    def get_ship_actions(self) -> List[BattleshipAction]:
-        busy_locations = set()
-        missing_ships = []
-        for ship in self.state.get_player_ships(active_player=True):
-            if ship.location is None:
-                missing_ships.append(ship)
-            else:
-                busy_locations.update(ship.location)
-        next_ship = missing_ships[0]
-        actions = [
-            BattleshipAction(action_type=ActionType.SET_SHIP, ship_name=next_ship.name, location=loc)
-            for loc in self.ship_locations[next_ship.length]
-            if len(set(loc).intersection(busy_locations)) == 0
-            ]
-        return actions
-
-    def get_shoot_actions(self) -> List[BattleshipAction]:
-        loc_options = set(self.shoot_locations).difference(set(self.state.get_player_shots(active_player=True)))
-        return [BattleshipAction(action_type=ActionType.SHOOT, location=[loc]) for loc in loc_options]
-
-    def get_list_action(self) -> List[BattleshipAction]:
+    def get_ship_actions(self) -> ShipActions:
+        next_ship = next(ship for ship in self.state.get_player_ships(active_player=True)
+                         if ship.location is None)
+        busy = self.boards[self.state.idx_player_active].ships
+        return ShipActions(next_ship.name, get_placements(next_ship.length, self.board_size), busy)
+
+    def get_fleet_actions(self, rng: random.Random) -> List[BattleshipAction]:
+        """ Actions setting all unplaced ships of the active player,
+        in a uniformly random layout around the placed ones """
+        ships = [ship for ship in self.state.get_player_ships(active_player=True)
+                 if ship.location is None]
+        layout = sample_fleet([ship.length for ship in ships], rng, self.board_size,
+                              self.boards[self.state.idx_player_active].ships)
+        if layout is None:
+            raise ValueError("Can't place the remaining ships")
+        return [
+            BattleshipAction(
+                action_type=ActionType.SET_SHIP, ship_name=ship.name, location=list(loc))
+            for ship, loc in zip(ships, layout)]
+
+    def get_shoot_actions(self) -> ShootActions:
+        return ShootActions(self.boards[self.state.idx_player_active], self.shoot_locations)
+
+    def get_list_action(self) -> Sequence[BattleshipAction]:
         if not self.state.all_ships_located():
             return self.get_ship_actions()
         if self.state.phase == GamePhase.FINISHED:
@@ -249,18 +645,19 @@ class Battleship(Game):
         return self.get_shoot_actions()
 
     def apply_action(self, action: BattleshipAction) -> None:
-        self.state.apply_action(action)
+        self.state.apply_action(action, self.boards)
 
     def get_player_view(self, idx_player: int) -> BattleshipGameState:
         if idx_player > 1:
             raise ValueError('There are only two players')
-        return self.state.get_masked_state(idx_player)
+        return self.state.get_masked_state(idx_player, self.boards)
 
 
 # pylint: disable = too-few-public-methods
 class RandomPlayer(Player):
 
-    def select_action(self, state: BattleshipGameState, actions: List[BattleshipAction]) -> Optional[BattleshipAction]:
+    def select_action(self, state: BattleshipGameState,
+                      actions: Sequence[BattleshipAction]) -> Optional[BattleshipAction]:
         """ Given masked game state and possible actions, select the next action """
         if len(actions) > 0:
             return random.choice(actions)
@@ -272,16 +669,16 @@ class NotSoRandomPlayer(Player):
     last_action = None
     last_successfull_action = None
 
-    def get_dist(self, a: BattleshipAction, b: BattleshipAction) -> float:
-        a_x = ord(a.location[0][0])
-        a_y = int(a.location[0][1:])
-        b_x = ord(b.location[0][0])
-        b_y = int(b.location[0][1:])
+    def get_dist(self, a: BattleshipAction, b: BattleshipAction,
+                 board_size: int = BOARD_SIZE) -> float:
+        a_x, a_y = divmod(get_cell_index(a.location[0], board_size), board_size)
+        b_x, b_y = divmod(get_cell_index(b.location[0], board_size), board_size)
         if a_x != b_x and a_y != b_y:
             return 100
         return abs(a_x - b_x) + abs(a_y - b_y)
 
-    def select_action(self, state: BattleshipGameState, actions: List[BattleshipAction]) -> BattleshipAction:
+    def select_action(self, state: BattleshipGameState,
+                      actions: Sequence[BattleshipAction]) -> BattleshipAction:
         action_selected = None
         if state.phase == GamePhase.SETUP:
             if len(actions) > 0:
@@ -294,7 +691,7 @@ class NotSoRandomPlayer(Player):
                 d_min = None
                 a_min = None
                 for action in actions:
-                    d = self.get_dist(self.last_successfull_action, action)
+                    d = self.get_dist(self.last_successfull_action, action, state.board_size)
                     if d_min is None or d_min > d:
                         d_min = d
                         a_min = action
@@ -310,6 +707,134 @@ class NotSoRandomPlayer(Player):
         return action_selected
 
 
+class ShotDensity:
+    """ Ship placements still possible on the opponent's board
+    and how many of them cover each cell """
+
+    def __init__(self, board_size: int, lengths: List[int]) -> None:
+        self.board_size = board_size
+        # remaining ships by length and their still possible placements
+        self.fleet: Dict[int, int] = {}
+        for length in lengths:
+            self.fleet[length] = self.fleet.get(length, 0) + 1
+        self.alive = {
+            length: np.ones(len(get_placement_matrix(length, board_size)), dtype=np.bool_)
+            for length in self.fleet}
+        cnt_cells = board_size * board_size
+        self.density = sum(
+            (cnt * get_placement_matrix(length, board_size).sum(axis=0)
+             for length, cnt in self.fleet.items()),
+            np.zeros(cnt_cells, dtype=np.int64))
+        self.shot = np.zeros(cnt_cells, dtype=np.bool_)
+        self.open_hits = np.zeros(cnt_cells, dtype=np.bool_)
+
+    def add_shot(self, idx_cell: int, is_hit: bool) -> None:
+        self.shot[idx_cell] = True
+        if is_hit:
+            self.open_hits[idx_cell] = True
+        else:
+            self.block_cell(idx_cell)
+
+    def block_cell(self, idx_cell: int) -> None:
+        """ No ship (left) can cover the cell: drop the placements through it """
+        for length, cnt in self.fleet.items():
+            matrix = get_placement_matrix(length, self.board_size)
+            dead = self.alive[length] & matrix[:, idx_cell]
+            if dead.any():
+                self.density -= cnt * matrix[dead].sum(axis=0)
+                self.alive[length] &= ~dead
+
+    def sink(self, cells: List[int]) -> None:
+        length = len(cells)
+        if self.fleet.get(length, 0) > 0:
+            matrix = get_placement_matrix(length, self.board_size)
+            self.density -= matrix[self.alive[length]].sum(axis=0)
+            self.fleet[length] -= 1
+        for idx_cell in cells:
+            self.open_hits[idx_cell] = False
+            self.block_cell(idx_cell)
+
+    def get_scores(self) -> npt.NDArray[np.int64]:
+        if not self.open_hits.any():
+            return self.density
+        # target mode: placements through open hits, the more hits they explain the better
+        hits = self.open_hits.astype(np.int64)
+        scores = np.zeros(len(self.density), dtype=np.int64)
+        for length, cnt in self.fleet.items():
+            if cnt == 0:
+                continue
+            rows = get_placement_matrix(length, self.board_size)[self.alive[length]]
+            cover = rows @ hits
+            weights = np.where(cover > 0, 4 ** cover, 0)
+            scores += cnt * (weights @ rows)
+        return scores if scores[~self.shot].any() else self.density
+
+
+class DensityPlayer(Player):
+    """ Hunt/target player: shoots the free cell covered by most of the ship placements
+    still possible, preferring placements through hits of ships that are not sunk yet """
+
+    def __init__(self, board_size: int = BOARD_SIZE, seed: Optional[int] = None) -> None:
+        self.rng = random.Random(seed)
+        self.cells = get_cell_names(board_size)
+        self.idx_cell = {cell: i for i, cell in enumerate(self.cells)}
+        # per game: the density map and how many of our shots and hits it holds
+        self.density: Optional[ShotDensity] = None
+        self.cnt_shots = 0
+        self.cnt_hits = 0
+        self.sunk: List[Ship] = []
+
+    def start_game(self, state: BattleshipGameState) -> ShotDensity:
+        if len(self.cells) != state.board_size * state.board_size:
+            self.cells = get_cell_names(state.board_size)
+            self.idx_cell = {cell: i for i, cell in enumerate(self.cells)}
+        me = state.players[state.idx_player_active]
+        self.density = ShotDensity(state.board_size, [ship.length for ship in me.ships])
+        self.cnt_shots = 0
+        self.cnt_hits = 0
+        self.sunk = []
+        return self.density
+
+    def update(self, state: BattleshipGameState) -> ShotDensity:
+        """ Apply the outcome of the shots fired since the last call """
+        me = state.players[state.idx_player_active]
+        density = self.density
+        if density is None or density.board_size != state.board_size \
+                or len(me.shots) < self.cnt_shots:
+            density = self.start_game(state)
+        # only the shots and hits since the last call, the cost doesn't grow with the history
+        new_hits = set(me.successful_shots[self.cnt_hits:])
+        for cell in me.shots[self.cnt_shots:]:
+            density.add_shot(self.idx_cell[cell], cell in new_hits)
+        self.cnt_shots = len(me.shots)
+        self.cnt_hits = len(me.successful_shots)
+        self.find_sunk(state, density)
+        return density
+
+    def find_sunk(self, state: BattleshipGameState, density: ShotDensity) -> None:
+        """ The masked view only shows sunk ships; with a full state check the hits ourselves """
+        for ship in state.players[(state.idx_player_active + 1) % 2].ships:
+            if not ship.location or ship in self.sunk:
+                continue
+            cells = [self.idx_cell[cell] for cell in ship.location]
+            if all(density.open_hits[cells]):
+                density.sink(cells)
+                self.sunk.append(ship)
+
+    def select_action(self, state: BattleshipGameState,
+                      actions: Sequence[BattleshipAction]) -> Optional[BattleshipAction]:
+        if len(actions) == 0:
+            return None
+        if state.phase != GamePhase.RUNNING:
+            self.density = None
+            return self.rng.choice(actions)
+        density = self.update(state)
+        scores = np.where(density.shot, -1, density.get_scores())
+        best = np.flatnonzero(scores == scores.max())
+        cell = self.cells[self.rng.choice(best.tolist())]
+        return BattleshipAction(action_type=ActionType.SHOOT, location=[cell])
+
+
 if __name__ == "__main__":
 
     game = Battleship()
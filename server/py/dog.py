@@ -1,12 +1,21 @@
-from server.py.game import Game, Player
-from typing import List, Optional, ClassVar
-from pydantic import BaseModel
+from typing import (
+    List, Optional, ClassVar, Dict, Tuple, NamedTuple, Callable, Iterable, Iterator, Sequence)
 from enum import Enum
-import random
+from array import array
 import copy
+import random
+import bisect
+import struct
+import hashlib
+from pydantic import BaseModel, ConfigDict
+import numpy as np
+import numpy.typing as npt
+from server.py.game import Game, Player, LazyActions, ActionList
 
 
 class Card(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     suit: str
     rank: str
 
@@ -70,9 +79,420 @@ class GameState(BaseModel):
     card_active: Optional[Card]
 
 
+# small integer codes for cards: rank-major in BASE_DECK order,
+# then joker and the masked placeholder
+CARD_KEYS: List[Tuple[str, str]] = [
+    (suit, rank) for rank in GameState.LIST_RANK[:-1] for suit in GameState.LIST_SUIT
+] + [('', 'JKR'), ('X', 'X')]
+CARD_CODE: Dict[Tuple[str, str], int] = {key: code for code, key in enumerate(CARD_KEYS)}
+# one shared immutable Card per code; cards in a game state are always these instances
+CARD_BY_CODE: List[Card] = [Card(suit=suit, rank=rank) for suit, rank in CARD_KEYS]
+CODE_BY_ID: Dict[int, int] = {id(card): code for code, card in enumerate(CARD_BY_CODE)}
+CODE_JOKER = CARD_CODE[('', 'JKR')]
+CODE_MASKED = CARD_CODE[('X', 'X')]
+NO_CARD_SWAP = -1
+
+GameState.BASE_DECK = [CARD_BY_CODE[CARD_CODE[(c.suit, c.rank)]] for c in GameState.BASE_DECK]
+
+
+def get_card_code(card: Card) -> Optional[int]:
+    """ Code of the card, None if it isn't a card of the deck """
+    code = CODE_BY_ID.get(id(card))
+    if code is None:
+        code = CARD_CODE.get((card.suit, card.rank))
+    return code
+
+
+def card_to_code(card: Card) -> int:
+    code = get_card_code(card)
+    if code is None:
+        raise ValueError(f'Unknown card {card}')
+    return code
+
+
+def code_to_card(code: int) -> Card:
+    return CARD_BY_CODE[code]
+
+
+def intern_card(card: Card) -> Card:
+    """ Return the shared instance for card (unknown cards are returned unchanged) """
+    code = CODE_BY_ID.get(id(card))
+    if code is None:
+        code = CARD_CODE.get((card.suit, card.rank))
+        if code is None:
+            return card
+    return CARD_BY_CODE[code]
+
+
+def get_action_key(action: 'Action') -> Tuple[int, Optional[int], Optional[int], int]:
+    card_swap = NO_CARD_SWAP if action.card_swap is None else card_to_code(action.card_swap)
+    return card_to_code(action.card), action.pos_from, action.pos_to, card_swap
+
+
+# joker substitutes: only A/K while everything is still in the kennel in round 1, otherwise any card
+JOKER_SWAP_START: List[Card] = [
+    CARD_BY_CODE[CARD_CODE[(s, r)]] for s in GameState.LIST_SUIT for r in ['A', 'K']]
+JOKER_SWAP_ALL: List[Card] = [
+    CARD_BY_CODE[CARD_CODE[(s, r)]] for s in GameState.LIST_SUIT for r in GameState.LIST_RANK[:-1]]
+
+
+class CompactState:
+    """ Immutable flat encoding of a GameState, cheap to copy, hash and compare
+
+    Layout of the buffer: header, per player the number of marbles and cards, the
+    pile sizes, all marble positions, all save flags, then the card codes of the
+    hands, the draw pile and the discard pile, and finally the player names.
+    """
+    # players, cnt_player, phase, cnt_round, exchanged, started, active, card
+    HEADER = struct.Struct('<BBBHBBBB')
+    PILES = struct.Struct('<HH')
+    LIST_PHASE: ClassVar[List[GamePhase]] = list(GamePhase)
+    NO_CARD = 255
+
+    __slots__ = ('buffer',)
+
+    def __init__(self, buffer: bytes) -> None:
+        self.buffer = buffer
+
+    @classmethod
+    def from_game_state(cls, state: GameState) -> 'CompactState':
+        list_player = state.list_player
+        card_active = cls.NO_CARD if state.card_active is None else card_to_code(state.card_active)
+        buf = bytearray(cls.HEADER.pack(
+            len(list_player), state.cnt_player, cls.LIST_PHASE.index(state.phase),
+            state.cnt_round, state.bool_card_exchanged, state.idx_player_started,
+            state.idx_player_active, card_active))
+        counts = array('B')
+        positions = array('B')
+        flags = array('B')
+        cards = array('B')
+        for p in list_player:
+            counts.append(len(p.list_marble))
+            counts.append(len(p.list_card))
+            positions.extend(m.pos for m in p.list_marble)
+            flags.extend(m.is_save for m in p.list_marble)
+            cards.extend(card_to_code(c) for c in p.list_card)
+        cards.extend(card_to_code(c) for c in state.list_card_draw)
+        cards.extend(card_to_code(c) for c in state.list_card_discard)
+        buf += counts.tobytes()
+        buf += cls.PILES.pack(len(state.list_card_draw), len(state.list_card_discard))
+        buf += positions.tobytes() + flags.tobytes() + cards.tobytes()
+        buf += '\0'.join(p.name for p in list_player).encode('utf-8')
+        return cls(bytes(buf))
+
+    def to_game_state(self) -> GameState:
+        buf = self.buffer
+        (cnt_list_player, cnt_player, phase, cnt_round, exchanged,
+         started, active, card_active) = self.HEADER.unpack_from(buf)
+        ofs = self.HEADER.size
+        counts = buf[ofs:ofs + 2 * cnt_list_player]
+        ofs += len(counts)
+        cnt_draw, cnt_discard = self.PILES.unpack_from(buf, ofs)
+        ofs += self.PILES.size
+        cnt_marble = sum(counts[0::2])
+        cnt_card = sum(counts[1::2]) + cnt_draw + cnt_discard
+        positions = buf[ofs:ofs + cnt_marble]
+        flags = buf[ofs + cnt_marble:ofs + 2 * cnt_marble]
+        ofs += 2 * cnt_marble
+        cards = [code_to_card(code) for code in buf[ofs:ofs + cnt_card]]
+        names = buf[ofs + cnt_card:].decode('utf-8').split('\0')
+
+        list_player = []
+        i_marble = 0
+        i_card = 0
+        for i in range(cnt_list_player):
+            n_marble, n_card = counts[2 * i], counts[2 * i + 1]
+            list_marble = [
+                Marble.model_construct(pos=positions[k], is_save=bool(flags[k]))
+                for k in range(i_marble, i_marble + n_marble)]
+            list_player.append(PlayerState.model_construct(
+                name=names[i], list_card=cards[i_card:i_card + n_card], list_marble=list_marble))
+            i_marble += n_marble
+            i_card += n_card
+        return GameState.model_construct(
+            cnt_player=cnt_player,
+            phase=self.LIST_PHASE[phase],
+            cnt_round=cnt_round,
+            bool_card_exchanged=bool(exchanged),
+            idx_player_started=started,
+            idx_player_active=active,
+            list_player=list_player,
+            list_card_draw=cards[i_card:i_card + cnt_draw],
+            list_card_discard=cards[i_card + cnt_draw:i_card + cnt_draw + cnt_discard],
+            card_active=None if card_active == self.NO_CARD else code_to_card(card_active))
+
+    def get_marble_positions(self, idx_player: int) -> List[int]:
+        cnt_list_player = self.buffer[0]
+        ofs = self.HEADER.size
+        counts = self.buffer[ofs:ofs + 2 * cnt_list_player]
+        ofs += len(counts) + self.PILES.size + sum(counts[0:2 * idx_player:2])
+        return list(self.buffer[ofs:ofs + counts[2 * idx_player]])
+
+    def copy(self) -> 'CompactState':
+        return self  # immutable
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, CompactState) and self.buffer == other.buffer
+
+    def __hash__(self) -> int:
+        return hash(self.buffer)
+
+
+HASH_MASK = (1 << 64) - 1
+ZOBRIST_KEYS: Dict[Tuple[object, ...], int] = {}
+
+
+def get_zobrist_key(*fields: object) -> int:
+    """ Fixed random 64 bit key for a feature of the state,
+    e.g. ('marble', idx_player, pos, is_save) """
+    key = ZOBRIST_KEYS.get(fields)
+    if key is None:
+        digest = hashlib.blake2b(repr(fields).encode(), digest_size=8).digest()
+        key = int.from_bytes(digest, 'little')
+        ZOBRIST_KEYS[fields] = key
+    return key
+
+
+def get_marble_key(idx_player: int, pos: int, is_save: bool) -> int:
+    return get_zobrist_key('marble', idx_player, pos, is_save)
+
+
+def get_card_key(idx_player: int, card: Card) -> int:
+    return get_zobrist_key('card', idx_player, card.suit, card.rank)
+
+
+# steps a card can move a marble in a normal move
+STEPS_BY_RANK: Dict[str, List[int]] = {
+    'A': [1, 11], '2': [2], '3': [3], '4': [4, -4], '5': [5], '6': [6],
+    '8': [8], '9': [9], '10': [10], 'Q': [12], 'K': [13]
+}
+LIST_STEPS = [-4] + list(range(1, 14))
+IDX_STEPS = {steps: i for i, steps in enumerate(LIST_STEPS)}
+CNT_CELLS = 96  # 64 ring squares + 4 x (4 kennel + 4 finish)
+CNT_PATH_CELLS = CNT_CELLS + 13  # moves inside the last finish can overshoot the board
+
+
+def calculate_move(idx_player: int, pos: int, steps: int) -> int:
+    if pos < 64:
+        raw_pos = pos + steps
+        finish_start = 64 + idx_player * 8 + 4
+        finish_end = finish_start + 4
+        if finish_start <= raw_pos < finish_end:
+            return raw_pos
+        return (pos + steps) % 64
+    return pos + steps
+
+
+def get_path_positions(start: int, end: int) -> List[int]:
+    if start < 64 and end < 64:
+        if end >= start:
+            return list(range(start, end + 1))
+        return list(range(start, 64)) + list(range(0, end + 1))
+    if start <= end:
+        return list(range(start, end + 1))
+    return list(range(end, start + 1))
+
+
+class Move(NamedTuple):
+    """ Precomputed move of a marble, see MOVE_TABLE """
+    pos_to: int
+    path: Tuple[int, ...]  # squares checked for blocking marbles (pos_from excluded)
+    path_mask: int  # the same squares as a bitmask
+
+
+def get_move_index(idx_player: int, pos_from: int, steps: int) -> int:
+    return (idx_player * CNT_CELLS + pos_from) * len(LIST_STEPS) + IDX_STEPS[steps]
+
+
+def get_cells_mask(cells: Iterable[int]) -> int:
+    mask = 0
+    for cell in cells:
+        mask |= 1 << cell
+    return mask
+
+
+def build_move_table() -> Dict[Tuple[int, int, int], Move]:
+    table = {}
+    for idx_player in range(4):
+        for pos_from in range(CNT_CELLS):
+            for steps in LIST_STEPS:
+                pos_to = calculate_move(idx_player, pos_from, steps)
+                if steps > 0:
+                    path = tuple(get_path_positions(pos_from, pos_to)[1:])
+                else:
+                    path = tuple(get_path_positions(pos_to, pos_from)[1:])
+                table[(idx_player, pos_from, steps)] = Move(pos_to, path, get_cells_mask(path))
+    return table
+
+
+# every move on the board: (player, pos_from, steps) -> Move
+MOVE_TABLE: Dict[Tuple[int, int, int], Move] = build_move_table()
+
+
+def get_move_path(idx_player: int, pos_from: int, pos_to: int,
+                  steps: int) -> Tuple[Tuple[int, ...], int]:
+    """ Squares passed by a move and their bitmask,
+    from the table unless the move is off the board """
+    move = MOVE_TABLE.get((idx_player, pos_from, steps))
+    if move is not None and move.pos_to == pos_to:
+        return move.path, move.path_mask
+    if steps > 0:
+        path = tuple(get_path_positions(pos_from, pos_to)[1:])
+    else:
+        path = tuple(get_path_positions(pos_to, pos_from)[1:])
+    return path, get_cells_mask(path)
+
+
+class MoveMasks(NamedTuple):
+    """ MOVE_TABLE as arrays, indexed by get_move_index """
+    dest: npt.NDArray[np.int64]  # destination square
+    path: npt.NDArray[np.uint64]  # squares to check for blocking marbles, as 2 x 64 bit words
+    # rejected regardless of the board (out of the kennel, backwards into finish)
+    invalid: npt.NDArray[np.bool_]
+
+
+MOVE_MASKS: Optional[MoveMasks] = None
+
+
+def get_move_masks() -> MoveMasks:
+    """ Build the array form of the move table on first use """
+    global MOVE_MASKS  # pylint: disable=global-statement
+    if MOVE_MASKS is None:
+        table = sorted(MOVE_TABLE.items(), key=lambda item: get_move_index(*item[0]))
+        dest = np.array([move.pos_to for _, move in table], dtype=np.int64)
+        words = np.array([[move.path_mask & 0xFFFFFFFFFFFFFFFF, move.path_mask >> 64]
+                          for _, move in table], dtype=np.uint64)
+        invalid = np.zeros(len(table), dtype=np.bool_)
+        for i, ((idx_player, pos_from, steps), move) in enumerate(table):
+            kennel_start = 64 + idx_player * 8
+            in_finish = kennel_start + 4 <= move.pos_to < kennel_start + 8
+            invalid[i] = kennel_start <= pos_from < kennel_start + 4 or (in_finish and steps < 0)
+        MOVE_MASKS = MoveMasks(dest, words, invalid)
+    return MOVE_MASKS
+
+
+def check_moves(flat: npt.NDArray[np.int64], blocking: npt.NDArray[np.uint64],
+                no_landing: npt.NDArray[np.bool_], rows: Optional[npt.NDArray[np.int64]] = None
+                ) -> Tuple[npt.NDArray[np.int64], npt.NDArray[np.bool_]]:
+    """ Destinations and validity of moves given by table index;
+    with rows, the board masks are per move row """
+    masks = get_move_masks()
+    dest = masks.dest[flat]
+    if rows is None:
+        words = masks.path[flat] & blocking
+        landing = no_landing[dest]
+    else:
+        words = masks.path[flat] & blocking[rows]
+        landing = no_landing[rows, dest]
+    valid = ~(masks.invalid[flat] | landing | (words[:, 0] != 0) | (words[:, 1] != 0))
+    return dest, valid
+
+
+class JackSwaps(LazyActions[Action]):
+    """ Swap actions of a J between every ordered pair of marbles, built only when accessed """
+
+    def __init__(self, card: Card, positions: Iterable[int]) -> None:
+        self.card = card
+        self.positions = tuple(dict.fromkeys(positions))
+        self.set_positions = frozenset(self.positions)
+
+    def __len__(self) -> int:
+        cnt = len(self.positions)
+        return cnt * (cnt - 1)
+
+    def get_cnt_outcomes(self) -> int:
+        """ Number of different boards after the swap, (a, b) and (b, a) end the same """
+        return len(self) // 2
+
+    def get_pair(self, index: int) -> Tuple[int, int]:
+        i, j = divmod(index, len(self.positions) - 1)
+        if j >= i:
+            j += 1
+        return self.positions[i], self.positions[j]
+
+    def get_action(self, index: int) -> Action:
+        pos_from, pos_to = self.get_pair(index)
+        return Action(card=self.card, pos_from=pos_from, pos_to=pos_to, card_swap=None)
+
+    def __iter__(self) -> Iterator[Action]:
+        for pos_from in self.positions:
+            for pos_to in self.positions:
+                if pos_from != pos_to:
+                    yield Action(card=self.card, pos_from=pos_from, pos_to=pos_to, card_swap=None)
+
+    def __contains__(self, value: object) -> bool:
+        return (isinstance(value, Action) and value.card_swap is None and value.card == self.card
+                and value.pos_from != value.pos_to
+                and value.pos_from in self.set_positions and value.pos_to in self.set_positions)
+
+
+class JokerSwaps(LazyActions[Action]):
+    """ Actions choosing the card a JKR stands for, built only when accessed """
+
+    def __init__(self, card: Card, list_swap: List[Card]) -> None:
+        self.card = card
+        self.list_swap = list_swap
+        self.set_swap = frozenset(list_swap)
+
+    def __len__(self) -> int:
+        return len(self.list_swap)
+
+    def get_action(self, index: int) -> Action:
+        return Action(card=self.card, pos_from=None, pos_to=None, card_swap=self.list_swap[index])
+
+    def __contains__(self, value: object) -> bool:
+        return (isinstance(value, Action) and value.card_swap is not None
+                and value.pos_from is None and value.pos_to is None and value.card == self.card
+                and value.card_swap in self.set_swap)
+
+
+# the two possible lists of JKR substitutions, shared by all games since they never change
+JOKER_ACTIONS_START = JokerSwaps(CARD_BY_CODE[CODE_JOKER], JOKER_SWAP_START)
+JOKER_ACTIONS_ALL = JokerSwaps(CARD_BY_CODE[CODE_JOKER], JOKER_SWAP_ALL)
+
+
+def copy_state(state: GameState, idx_player_view: Optional[int] = None) -> GameState:
+    """ Copy sharing the immutable cards;
+    with idx_player_view set, the hands of the others are face down """
+    masked = CARD_BY_CODE[CODE_MASKED]
+    list_player = [
+        PlayerState.model_construct(
+            name=p.name,
+            list_card=(p.list_card.copy() if idx_player_view is None or i == idx_player_view
+                       else [masked] * len(p.list_card)),
+            list_marble=[Marble.model_construct(pos=mm.pos, is_save=mm.is_save)
+                         for mm in p.list_marble])
+        for i, p in enumerate(state.list_player)]
+    return GameState.model_construct(
+        cnt_player=state.cnt_player,
+        phase=state.phase,
+        cnt_round=state.cnt_round,
+        bool_card_exchanged=state.bool_card_exchanged,
+        idx_player_started=state.idx_player_started,
+        idx_player_active=state.idx_player_active,
+        list_player=list_player,
+        list_card_draw=state.list_card_draw.copy(),
+        list_card_discard=state.list_card_discard.copy(),
+        card_active=state.card_active)
+
+
+class SevenStep(NamedTuple):
+    """ One partial move of a SEVEN, enough to roll it back
+    (marbles given as player and slot index) """
+    idx_player: int
+    idx_marble: int
+    pos_from: int
+    is_save_from: bool
+    steps: int
+    # (owner, idx_marble, pos, is_save) of overtaken marbles
+    sent_home: List[Tuple[int, int, int, bool]]
+
+
 class Dog(Game):
 
-    def __init__(self) -> None:
+    def __init__(self, seed: Optional[int] = None) -> None:
+        # all shuffles and draws of this game, reproducible when a seed is given
+        self.rng = random.Random(seed)
         cards = GameState.BASE_DECK.copy()
         list_player = []
         for i in range(4):
@@ -83,7 +503,7 @@ class Dog(Game):
             phase=GamePhase.RUNNING,
             cnt_round=1,
             bool_card_exchanged=False,
-            idx_player_started=random.randint(0, 3),
+            idx_player_started=self.rng.randint(0, 3),
             idx_player_active=0,
             list_player=list_player,
             list_card_draw=cards,
@@ -91,13 +511,36 @@ class Dog(Game):
             card_active=None
         )
 
-        self.seven_backup_state = None
+        # partial moves of the SEVEN in progress (None if no SEVEN was started)
+        self.seven_journal: Optional[List[SevenStep]] = None
+        self.seven_card_active: Optional[Card] = None
+        self.seven_steps_used = 0
         self.joker_chosen = False
         self.exchange_buffer = [None, None, None, None]
+        # position -> [(owner, marble), ...]; more than one entry only for stacked kennel marbles
+        self.marble_index: Dict[int, List[Tuple[int, Marble]]] = {}
+        # sums of the zobrist keys of all marbles and all hand cards,
+        # kept up to date by the mutators
+        # (added instead of xor-ed, so two equal cards in a hand don't cancel out)
+        self.board_hash = 0
+        self.hand_hash = 0
+
+        # state_version changes with every apply_action/set_state,
+        # board_version whenever a marble moves;
+        # callers that edit the object from get_state() must hand it back through set_state()
+        self.state_version = 0
+        self.board_version = 0
+        self.action_cache: Optional[Tuple[int, Sequence[Action]]] = None
+        self.card_action_cache: Dict[Tuple[str, int, int], Sequence[Action]] = {}
+        self.card_action_cache_version = -1
+        self.blocking_mask: Optional[Tuple[int, int]] = None
+        self.view_cache: Dict[int, Tuple[int, GameState]] = {}
+        self.cache_stats = {'list_hit': 0, 'list_miss': 0, 'card_hit': 0, 'card_miss': 0}
 
         self.reset()
 
     def reset(self):
+        self.state_version += 1
         for i, p in enumerate(self.state.list_player):
             p.list_marble = []
             kennel_start = 64 + i * 8
@@ -109,31 +552,111 @@ class Dog(Game):
         self.state.bool_card_exchanged = False
         self.state.card_active = None
         self.joker_chosen = False
-        self.seven_backup_state = None
+        self.seven_journal = None
         self.exchange_buffer = [None, None, None, None]
 
         self.state.idx_player_active = self.state.idx_player_started
         self.state.list_card_draw = GameState.BASE_DECK.copy()
-        random.shuffle(self.state.list_card_draw)
+        self.rng.shuffle(self.state.list_card_draw)
         self.state.list_card_discard = []
         self.deal_cards_for_round(self.state.cnt_round)
+        self.rebuild_marble_index()
 
     def set_state(self, state: GameState) -> None:
+        self.state_version += 1
         self.state = state
+        self.intern_cards()
+        self.rebuild_marble_index()
+        self.hand_hash = self.compute_hand_hash()
 
     def get_state(self) -> GameState:
         return self.state
 
+    def intern_cards(self) -> None:
+        """ Replace the cards of the state by their shared instances """
+        state = self.state
+        for p in state.list_player:
+            p.list_card = [intern_card(c) for c in p.list_card]
+        state.list_card_draw = [intern_card(c) for c in state.list_card_draw]
+        state.list_card_discard = [intern_card(c) for c in state.list_card_discard]
+        if state.card_active is not None:
+            state.card_active = intern_card(state.card_active)
+
+    def get_hash(self) -> int:
+        """ 64 bit hash of the marbles, hands, active card and turn
+        (the draw and discard piles are not included) """
+        state = self.state
+        h = self.board_hash + self.hand_hash + get_zobrist_key(
+            'turn', state.phase.value, state.cnt_round, state.bool_card_exchanged,
+            state.idx_player_started, state.idx_player_active, self.joker_chosen,
+            self.seven_steps_used)
+        if state.card_active is not None:
+            h += get_zobrist_key('active', state.card_active.suit, state.card_active.rank)
+        for i, c in enumerate(self.exchange_buffer):
+            if c is not None:
+                h += get_zobrist_key('exchange', i, c.suit, c.rank)
+        return h & HASH_MASK
+
+    def compute_board_hash(self) -> int:
+        h = 0
+        for p_idx, p in enumerate(self.state.list_player):
+            for mm in p.list_marble:
+                h += get_marble_key(p_idx, mm.pos, mm.is_save)
+        return h & HASH_MASK
+
+    def compute_hand_hash(self) -> int:
+        h = 0
+        for p_idx, p in enumerate(self.state.list_player):
+            for c in p.list_card:
+                h += get_card_key(p_idx, c)
+        return h & HASH_MASK
+
+    def get_compact_state(self) -> CompactState:
+        return CompactState.from_game_state(self.state)
+
+    def set_compact_state(self, compact: CompactState) -> None:
+        self.set_state(compact.to_game_state())
+
     def print_state(self) -> None:
         pass
 
     def get_player_view(self, idx_player: int) -> GameState:
-        masked_state = self.state.copy(deep=True)
-        if masked_state.phase != GamePhase.FINISHED:
-            for i, p in enumerate(masked_state.list_player):
-                if i != idx_player:
-                    p.list_card = [Card(suit='X', rank='X') for _ in p.list_card]
-        return masked_state
+        """ Masked state for idx_player, cached until the state changes
+        (shared, so don't modify it) """
+        cached = self.view_cache.get(idx_player)
+        if cached is not None and cached[0] == self.state_version:
+            return cached[1]
+        view = self.build_player_view(idx_player)
+        self.view_cache[idx_player] = (self.state_version, view)
+        return view
+
+    def build_player_view(self, idx_player: int) -> GameState:
+        """ Copy of the state with the other hands face down;
+        cards are immutable and shared, marbles are copied """
+        idx_view = None if self.state.phase == GamePhase.FINISHED else idx_player
+        return copy_state(self.state, idx_view)
+
+    def clone(self, state: Optional[GameState] = None,
+              rng: Optional[random.Random] = None) -> 'Dog':
+        """ Independent copy of the engine, optionally continuing from another state
+        of the same game (e.g. a player view with sampled hidden cards) or drawing from another rng;
+        cheaper than a new game """
+        twin = copy.copy(self)
+        if rng is None:
+            twin.rng = random.Random()
+            twin.rng.setstate(self.rng.getstate())
+        else:
+            twin.rng = rng
+        twin.seven_journal = None if self.seven_journal is None else self.seven_journal.copy()
+        twin.exchange_buffer = self.exchange_buffer.copy()
+        twin.action_cache = None
+        twin.card_action_cache = {}
+        twin.card_action_cache_version = -1
+        twin.blocking_mask = None
+        twin.view_cache = {}
+        twin.cache_stats = dict.fromkeys(self.cache_stats, 0)
+        twin.set_state(copy_state(self.state) if state is None else state)
+        return twin
 
     def deal_cards_for_round(self, round_num: int):
         pattern = [6, 5, 4, 3, 2]
@@ -142,19 +665,109 @@ class Dog(Game):
         self.check_and_reshuffle()
         for p in self.state.list_player:
             p.list_card = []
+        # deal from the front with a cursor and drop the dealt cards once,
+        # instead of pop(0) per card
+        draw = self.state.list_card_draw
+        cursor = 0
         for i in range(self.state.cnt_player):
+            hand = self.state.list_player[i].list_card
             for _ in range(cnt_cards):
-                if not self.state.list_card_draw:
+                if cursor == len(draw):
+                    draw.clear()
+                    cursor = 0
                     self.check_and_reshuffle()
-                self.state.list_player[i].list_card.append(self.state.list_card_draw.pop(0))
+                    draw = self.state.list_card_draw
+                hand.append(draw[cursor])
+                cursor += 1
+        del draw[:cursor]
+        self.hand_hash = self.compute_hand_hash()
 
     def check_and_reshuffle(self):
         if not self.state.list_card_draw and self.state.list_card_discard:
             self.state.list_card_draw = self.state.list_card_discard.copy()
             self.state.list_card_discard = []
-            random.shuffle(self.state.list_card_draw)
+            self.rng.shuffle(self.state.list_card_draw)
+
+    def get_list_action(self) -> Sequence[Action]:
+        """ Get the actions of the active player, cached until the state changes """
+        if self.action_cache is not None and self.action_cache[0] == self.state_version:
+            self.cache_stats['list_hit'] += 1
+            return self.action_cache[1]
+        self.cache_stats['list_miss'] += 1
+        version = self.state_version
+        actions = self.generate_list_action()
+        if self.state_version == version:  # generating may have completed the card exchange
+            self.action_cache = (version, actions)
+        return actions
 
-    def get_list_action(self) -> List[Action]:
+    def get_cached_card_actions(
+            self, kind: str, idx_player: int, card: Card,
+            generate: Callable[[int, Card], Sequence[Action]]) -> Sequence[Action]:
+        """ Reuse start/normal/jack actions of a card as long as no marble has moved """
+        cache = self.get_card_action_cache()
+        key = (kind, idx_player, card_to_code(card))
+        actions = cache.get(key)
+        if actions is None:
+            self.cache_stats['card_miss'] += 1
+            actions = generate(idx_player, card)
+            cache[key] = actions
+        else:
+            self.cache_stats['card_hit'] += 1
+        return actions
+
+    def get_cached_normal_moves(self, idx_player: int,
+                                cards: List[Card]) -> Dict[int, Sequence[Action]]:
+        """ Like get_cached_card_actions for the normal moves of a whole hand """
+        cache = self.get_card_action_cache()
+        result = {}
+        for c in cards:
+            code = card_to_code(c)
+            actions = cache.get(('normal', idx_player, code))
+            if actions is None:
+                self.cache_stats['card_miss'] += 1
+                actions = cache[('normal', idx_player, code)] = self.get_normal_moves(idx_player, c)
+            else:
+                self.cache_stats['card_hit'] += 1
+            result[code] = actions
+        return result
+
+    def get_uncached_normal_codes(self) -> List[int]:
+        """ Codes of the cards whose normal moves the next get_list_action would have to compute """
+        state = self.state
+        if self.action_cache is not None and self.action_cache[0] == self.state_version:
+            return []
+        if state.phase == GamePhase.FINISHED:
+            return []
+        if state.cnt_round == 0 and not state.bool_card_exchanged:
+            return []
+        if state.card_active is None:
+            cards = state.list_player[state.idx_player_active].list_card
+        elif self.joker_chosen:
+            cards = [state.card_active]
+        else:
+            return []
+        cache = self.get_card_action_cache()
+        result: Dict[int, None] = {}
+        for c in cards:
+            code = card_to_code(c)
+            if c.rank in STEPS_BY_RANK and ('normal', state.idx_player_active, code) not in cache:
+                result[code] = None
+        return list(result)
+
+    def store_normal_moves(self, idx_player: int, moves: Dict[int, List[Action]]) -> None:
+        """ Hand in normal moves computed elsewhere (e.g. by DogBatch) for the current board """
+        cache = self.get_card_action_cache()
+        for code, actions in moves.items():
+            self.cache_stats['card_miss'] += 1
+            cache[('normal', idx_player, code)] = actions
+
+    def get_card_action_cache(self) -> Dict[Tuple[str, int, int], Sequence[Action]]:
+        if self.card_action_cache_version != self.board_version:
+            self.card_action_cache = {}
+            self.card_action_cache_version = self.board_version
+        return self.card_action_cache
+
+    def generate_list_action(self) -> Sequence[Action]:
         if self.state.phase == GamePhase.FINISHED:
             return []
 
@@ -164,7 +777,9 @@ class Dog(Game):
         # card exchange phase if cnt_round=0
         if self.state.cnt_round == 0 and not self.state.bool_card_exchanged:
             if self.exchange_buffer[idx] is None:
-                return [Action(card=Card(suit=c.suit, rank=c.rank), pos_from=None, pos_to=None, card_swap=None) for c in player.list_card]
+                codes = dict.fromkeys(card_to_code(c) for c in player.list_card)
+                return [Action(card=CARD_BY_CODE[code], pos_from=None, pos_to=None, card_swap=None)
+                        for code in codes]
             else:
                 if all(x is not None for x in self.exchange_buffer):
                     self.perform_card_exchange()
@@ -182,87 +797,77 @@ class Dog(Game):
         if self.state.card_active and self.state.card_active.rank == 'JKR' and not self.joker_chosen:
             return []
 
-        actions = []
+        segments: List[Sequence[Action]] = []
+        actions: List[Action] = []
         used = set()
+        codes_seen = set()
+
+        def add(code: int, list_action: Sequence[Action]) -> None:
+            for a in list_action:
+                code_swap = NO_CARD_SWAP if a.card_swap is None else card_to_code(a.card_swap)
+                key = (code, a.pos_from, a.pos_to, code_swap)
+                if key not in used:
+                    actions.append(a)
+                    used.add(key)
+
+        def add_lazy(list_action: Sequence[Action]) -> None:
+            # no key can repeat: J swaps and JKR substitutions only come from their own card
+            nonlocal actions
+            segments.append(actions)
+            segments.append(list_action)
+            actions = []
+
+        list_card = []
         for c in player.list_card:
-            base_card = Card(suit=c.suit, rank=c.rank)
-            if c.rank == 'JKR':
+            code = card_to_code(c)
+            if code not in codes_seen:  # a second copy of a card has exactly the same actions
+                codes_seen.add(code)
+                list_card.append(CARD_BY_CODE[code])
+        normal_moves = self.get_cached_normal_moves(
+            idx, [c for c in list_card if c.rank in STEPS_BY_RANK])
+
+        for c in list_card:
+            code = card_to_code(c)
+            if code == CODE_JOKER:
                 # start actions
-                start_actions = self.get_start_actions(idx, c)
-                for a in start_actions:
-                    key = (str(a.card), a.pos_from, a.pos_to, str(a.card_swap))
-                    if key not in used:
-                        actions.append(a)
-                        used.add(key)
+                add(code, self.get_cached_card_actions('start', idx, c, self.get_start_actions))
 
                 # card_swap actions for JKR
                 if self.state.cnt_round == 1 and all(self.is_in_kennel(m.pos, idx) for m in player.list_marble):
-                    LIST_SUIT = self.state.LIST_SUIT
-                    for s in LIST_SUIT:
-                        for r in ['A', 'K']:
-                            swap_card = Card(suit=s, rank=r)
-                            a = Action(card=Card(suit=c.suit, rank=c.rank), pos_from=None, pos_to=None, card_swap=swap_card)
-                            key = (str(a.card), a.pos_from, a.pos_to, str(a.card_swap))
-                            if key not in used:
-                                actions.append(a)
-                                used.add(key)
+                    add_lazy(JOKER_ACTIONS_START)
                 else:
-                    LIST_SUIT = self.state.LIST_SUIT
-                    full_ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
-                    for s in LIST_SUIT:
-                        for r in full_ranks:
-                            swap_card = Card(suit=s, rank=r)
-                            a = Action(card=Card(suit=c.suit, rank=c.rank), pos_from=None, pos_to=None, card_swap=swap_card)
-                            key = (str(a.card), a.pos_from, a.pos_to, str(a.card_swap))
-                            if key not in used:
-                                actions.append(a)
-                                used.add(key)
+                    add_lazy(JOKER_ACTIONS_ALL)
             elif c.rank == 'J':
-                j_actions = self.get_j_actions(idx, c)
-                for a in j_actions:
-                    key = (str(a.card), a.pos_from, a.pos_to, str(a.card_swap))
-                    if key not in used:
-                        actions.append(a)
-                        used.add(key)
+                add_lazy(self.get_cached_card_actions('j', idx, c, self.get_j_actions))
             else:
                 if c.rank in ['A', 'K']:
-                    start_actions = self.get_start_actions(idx, c)
-                    for a in start_actions:
-                        key = (str(a.card), a.pos_from, a.pos_to, str(a.card_swap))
-                        if key not in used:
-                            actions.append(a)
-                            used.add(key)
-                normal_actions = self.get_normal_moves(idx, c)
-                for a in normal_actions:
-                    key = (str(a.card), a.pos_from, a.pos_to, str(a.card_swap))
-                    if key not in used:
-                        actions.append(a)
-                        used.add(key)
-        return actions
+                    add(code, self.get_cached_card_actions('start', idx, c, self.get_start_actions))
+                add(code, normal_moves.get(code, []))
+        segments.append(actions)
+        return ActionList(segments)
 
     def apply_action(self, action: Optional[Action]) -> None:
+        self.state_version += 1
         if self.state.phase == GamePhase.FINISHED:
             return
 
         idx = self.state.idx_player_active
-        player = self.state.list_player[idx]
 
         # card exchange
         if self.state.cnt_round == 0 and not self.state.bool_card_exchanged:
             if action is None:
                 return
-            if not any((action.card == c for c in player.list_card)):
+            if not self.has_card_in_hand(idx, action.card):
                 return
-            self.exchange_buffer[idx] = action.card
-            player.list_card.remove(action.card)
+            self.exchange_buffer[idx] = intern_card(action.card)
+            self.remove_card_from_hand(idx, action.card)
             self.next_player_for_exchange()
             return
 
         # card_active=JKR no chosen card yet
         if self.state.card_active and self.state.card_active.rank == 'JKR' and not self.joker_chosen and action and action.card_swap is not None:
-            if action.card in player.list_card:
-                player.list_card.remove(action.card)
-            self.state.card_active = action.card_swap
+            self.remove_card_from_hand(idx, action.card)
+            self.state.card_active = intern_card(action.card_swap)
             self.joker_chosen = True
             return
 
@@ -273,7 +878,7 @@ class Dog(Game):
                 self.end_turn()
                 return
             if action.card.rank == '7':
-                if self.seven_backup_state is None:
+                if self.seven_journal is None:
                     self.save_backup_state()
                 success = self.apply_seven_step(action)
                 if not success:
@@ -338,15 +943,16 @@ class Dog(Game):
             return
 
     def perform_card_exchange(self):
+        self.state_version += 1
         c0 = self.exchange_buffer[0]
         c1 = self.exchange_buffer[1]
         c2 = self.exchange_buffer[2]
         c3 = self.exchange_buffer[3]
 
-        self.state.list_player[0].list_card.append(c2)
-        self.state.list_player[2].list_card.append(c0)
-        self.state.list_player[1].list_card.append(c3)
-        self.state.list_player[3].list_card.append(c1)
+        self.add_card_to_hand(0, c2)
+        self.add_card_to_hand(2, c0)
+        self.add_card_to_hand(1, c3)
+        self.add_card_to_hand(3, c1)
 
         self.exchange_buffer = [None, None, None, None]
         self.state.bool_card_exchanged = True
@@ -380,17 +986,18 @@ class Dog(Game):
         self.deal_cards_for_round(self.state.cnt_round)
         self.state.card_active = None
         self.joker_chosen = False
-        self.seven_backup_state = None
+        self.seven_journal = None
         self.exchange_buffer = [None, None, None, None]
 
     def fold_cards(self, idx_player: int):
         p = self.state.list_player[idx_player]
         for c in p.list_card:
             self.discard_card(c)
+            self.hand_hash = (self.hand_hash - get_card_key(idx_player, c)) & HASH_MASK
         p.list_card = []
 
     def discard_card(self, card: Card):
-        self.state.list_card_discard.append(card)
+        self.state.list_card_discard.append(intern_card(card))
 
     def check_game_finished(self):
         if self.team_finished([0, 2]) or self.team_finished([1, 3]):
@@ -409,13 +1016,28 @@ class Dog(Game):
         finish_end = finish_start + 4
         return finish_start <= pos < finish_end
 
+    def find_card_in_hand(self, idx_player: int, card: Card) -> int:
+        code = get_card_code(card)
+        if code is None:
+            return -1
+        for i, c in enumerate(self.state.list_player[idx_player].list_card):
+            if get_card_code(c) == code:
+                return i
+        return -1
+
     def has_card_in_hand(self, idx_player: int, card: Card):
-        return card in self.state.list_player[idx_player].list_card
+        return self.find_card_in_hand(idx_player, card) >= 0
 
     def remove_card_from_hand(self, idx_player: int, card: Card):
-        p = self.state.list_player[idx_player]
-        if card in p.list_card:
-            p.list_card.remove(card)
+        i = self.find_card_in_hand(idx_player, card)
+        if i >= 0:
+            list_card = self.state.list_player[idx_player].list_card
+            self.hand_hash = (self.hand_hash - get_card_key(idx_player, list_card[i])) & HASH_MASK
+            del list_card[i]
+
+    def add_card_to_hand(self, idx_player: int, card: Card) -> None:
+        self.state.list_player[idx_player].list_card.append(card)
+        self.hand_hash = (self.hand_hash + get_card_key(idx_player, card)) & HASH_MASK
 
     def get_start_actions(self, idx_player: int, card: Card):
         start_field = idx_player * 16
@@ -440,26 +1062,13 @@ class Dog(Game):
                 for km_pos in kennel_positions:
                     if self.own_marble_at_pos(idx_player, km_pos):
                         actions.append(Action(
-                            card=Card(suit=card.suit, rank=card.rank),
+                            card=intern_card(card),
                             pos_from=km_pos, pos_to=start_field, card_swap=None))
         return actions
 
     def get_normal_moves(self, idx_player: int, card: Card):
-        rank = card.rank
-        if rank == 'A':
-            steps_options = [1, 11]
-        elif rank in ['2', '3', '5', '6', '8', '9', '10']:
-            if rank == '10':
-                steps_options = [10]
-            else:
-                steps_options = [int(rank)]
-        elif rank == '4':
-            steps_options = [4, -4]
-        elif rank == 'Q':
-            steps_options = [12]
-        elif rank == 'K':
-            steps_options = [13]
-        else:
+        steps_options = STEPS_BY_RANK.get(card.rank)
+        if steps_options is None:
             return []
 
         actions = []
@@ -469,30 +1078,36 @@ class Dog(Game):
                 pos_to = self.calculate_move(idx_player, mm.pos, st)
                 if self.is_move_valid(idx_player, mm.pos, pos_to, st, card):
                     actions.append(Action(
-                        card=Card(suit=card.suit, rank=card.rank),
+                        card=intern_card(card),
                         pos_from=mm.pos, pos_to=pos_to, card_swap=None))
         return actions
 
-    def get_j_actions(self, idx_player: int, card: Card):
-        actions = []
-        marbles_info = []
+    def get_blocking_mask(self) -> int:
+        """ Bitmask of the squares blocked by a save marble on its own start """
+        if self.blocking_mask is None or self.blocking_mask[0] != self.board_version:
+            mask = 0
+            for pos in range(0, 64, 16):
+                entries = self.marble_index.get(pos)
+                if entries and pos == entries[0][0] * 16 and entries[0][1].is_save:
+                    mask |= 1 << pos
+            self.blocking_mask = (self.board_version, mask)
+        return self.blocking_mask[1]
+
+    def is_landing_blocked(self, pos_to: int) -> bool:
+        """ Marbles in their finish can't be sent home """
+        o_idx = self.get_marble_owner(pos_to)
+        return o_idx is not None and self.is_in_finish(pos_to, o_idx)
+
+    def get_j_actions(self, idx_player: int, card: Card) -> JackSwaps:
+        positions = []
         for p_idx, pl in enumerate(self.state.list_player):
             for mm in pl.list_marble:
                 if not self.is_in_kennel(mm.pos, p_idx) and not self.is_in_finish(mm.pos, p_idx):
                     start_pos = p_idx * 16
                     if mm.pos == start_pos and mm.is_save:
                         continue
-                    marbles_info.append((p_idx, mm.pos, mm.is_save))
-
-        for i in range(len(marbles_info)):
-            for j in range(len(marbles_info)):
-                if i != j:
-                    pos_from = marbles_info[i][1]
-                    pos_to = marbles_info[j][1]
-                    actions.append(Action(
-                        card=Card(suit=card.suit, rank=card.rank),
-                        pos_from=pos_from, pos_to=pos_to, card_swap=None))
-        return actions
+                    positions.append(mm.pos)
+        return JackSwaps(intern_card(card), positions)
 
     def get_actions_for_seven(self, idx_player: int):
         remain = 7 - self.count_used_7_steps()
@@ -500,14 +1115,14 @@ class Dog(Game):
             return []
         actions = []
         used = set()
-        # always create a new 7-card:
-        seven_card = Card(suit='♣', rank='7')
+        # always play the actions with the same 7-card:
+        seven_card = CARD_BY_CODE[CARD_CODE[('♣', '7')]]
         p = self.state.list_player[idx_player]
         for mm in p.list_marble:
             for step in range(1, remain + 1):
                 pos_to = self.calculate_move(idx_player, mm.pos, step)
                 if self.can_apply_7_step(mm.pos, pos_to, idx_player):
-                    a = Action(card=Card(suit=seven_card.suit, rank=seven_card.rank), pos_from=mm.pos, pos_to=pos_to, card_swap=None)
+                    a = Action(card=seven_card, pos_from=mm.pos, pos_to=pos_to, card_swap=None)
                     key = (a.pos_from, a.pos_to)
                     if key not in used:
                         actions.append(a)
@@ -515,69 +1130,96 @@ class Dog(Game):
         return actions
 
     def get_actions_for_card(self, card: Card, idx_player: int):
-        # create fresh card instance
-        ccard = Card(suit=card.suit, rank=card.rank)
+        ccard = intern_card(card)
         if card.rank == '7':
             return self.get_actions_for_seven(idx_player)
+        if ccard.rank == 'J':
+            return self.get_cached_card_actions('j', idx_player, ccard, self.get_j_actions)
 
         actions = []
         used = set()
         if ccard.rank in ['A', 'K']:
-            start_actions = self.get_start_actions(idx_player, ccard)
+            start_actions = self.get_cached_card_actions(
+                'start', idx_player, ccard, self.get_start_actions)
             for a in start_actions:
-                k = (str(a.card), a.pos_from, a.pos_to, str(a.card_swap))
+                k = get_action_key(a)
                 if k not in used:
                     actions.append(a)
                     used.add(k)
 
-        if ccard.rank == 'J':
-            j_actions = self.get_j_actions(idx_player, ccard)
-            for a in j_actions:
-                k = (str(a.card), a.pos_from, a.pos_to, str(a.card_swap))
-                if k not in used:
-                    actions.append(a)
-                    used.add(k)
-
-        if ccard.rank not in ['J', '7']:
-            normal_actions = self.get_normal_moves(idx_player, ccard)
-            for a in normal_actions:
-                k = (str(a.card), a.pos_from, a.pos_to, str(a.card_swap))
-                if k not in used:
-                    actions.append(a)
-                    used.add(k)
+        normal_actions = self.get_cached_card_actions(
+            'normal', idx_player, ccard, self.get_normal_moves)
+        for a in normal_actions:
+            k = get_action_key(a)
+            if k not in used:
+                actions.append(a)
+                used.add(k)
         return actions
 
     def is_in_kennel(self, pos: int, idx_player: int):
         kennel_start = 64 + idx_player * 8
         return kennel_start <= pos < kennel_start + 4
 
-    def get_marble_at_pos(self, pos: int):
+    def rebuild_marble_index(self) -> None:
+        self.board_version += 1
+        self.marble_index = {}
         for p_idx, p in enumerate(self.state.list_player):
             for mm in p.list_marble:
-                if mm.pos == pos:
-                    return pos
+                self.marble_index.setdefault(mm.pos, []).append((p_idx, mm))
+        self.board_hash = self.compute_board_hash()
+
+    def place_marble(self, idx_player: int, marble: Marble, pos: int,
+                     is_save: Optional[bool] = None) -> None:
+        """ Move a marble to pos (and optionally set is_save),
+        keeping the position index and hash in sync """
+        self.board_version += 1
+        if is_save is None:
+            is_save = marble.is_save
+        self.board_hash = (self.board_hash - get_marble_key(idx_player, marble.pos, marble.is_save)
+                           + get_marble_key(idx_player, pos, is_save)) & HASH_MASK
+        marble.is_save = is_save
+        entries = self.marble_index.get(marble.pos, [])
+        for i, (_, mm) in enumerate(entries):
+            if mm is marble:
+                del entries[i]
+                break
+        if not entries:
+            self.marble_index.pop(marble.pos, None)
+        marble.pos = pos
+        entries = self.marble_index.setdefault(pos, [])
+        if entries:
+            # keep stacked marbles in state order, like a scan over list_player would find them
+            order = [(o_idx, self.get_marble_slot(o_idx, mm)) for o_idx, mm in entries]
+            key = (idx_player, self.get_marble_slot(idx_player, marble))
+            entries.insert(bisect.bisect(order, key), (idx_player, marble))
+        else:
+            entries.append((idx_player, marble))
+
+    def get_marble_slot(self, idx_player: int, marble: Marble) -> int:
+        for i, mm in enumerate(self.state.list_player[idx_player].list_marble):
+            if mm is marble:
+                return i
+        raise ValueError('Marble does not belong to player')
+
+    def get_marble_at_pos(self, pos: int):
+        if pos in self.marble_index:
+            return pos
         return None
 
     def get_marble_owner(self, pos: int):
-        for p_idx, p in enumerate(self.state.list_player):
-            for mm in p.list_marble:
-                if mm.pos == pos:
-                    return p_idx
+        entries = self.marble_index.get(pos)
+        if entries:
+            return entries[0][0]
         return None
 
     def get_marble_by_pos(self, p_idx: int, pos: int):
-        p = self.state.list_player[p_idx]
-        for mm in p.list_marble:
-            if mm.pos == pos:
+        for o_idx, mm in self.marble_index.get(pos, ()):
+            if o_idx == p_idx:
                 return mm
         return None
 
     def own_marble_at_pos(self, idx_player: int, pos: int):
-        p = self.state.list_player[idx_player]
-        for mm in p.list_marble:
-            if mm.pos == pos:
-                return True
-        return False
+        return self.get_marble_by_pos(idx_player, pos) is not None
 
     def has_marble_in_kennel(self, idx_player: int):
         kennel_start = 64 + idx_player * 8
@@ -588,81 +1230,37 @@ class Dog(Game):
         return False
 
     def calculate_move(self, idx_player: int, pos: int, steps: int):
-        if pos < 64:
-            raw_pos = pos + steps
-            finish_start = 64 + idx_player * 8 + 4
-            finish_end = finish_start + 4
-            if finish_start <= raw_pos < finish_end:
-                return raw_pos
-            else:
-                return (pos + steps) % 64
-        else:
-            return pos + steps
+        move = MOVE_TABLE.get((idx_player, pos, steps))
+        if move is not None:
+            return move.pos_to
+        return calculate_move(idx_player, pos, steps)
 
     def get_path_positions(self, start: int, end: int):
-        if start < 64 and end < 64:
-            if end >= start:
-                return list(range(start, end + 1))
-            else:
-                return list(range(start, 64)) + list(range(0, end + 1))
-        else:
-            if start <= end:
-                return list(range(start, end + 1))
-            else:
-                return list(range(end, start + 1))
+        return get_path_positions(start, end)
 
     def is_move_valid(self, idx_player: int, pos_from: int, pos_to: int, steps: int, card: Card):
         if self.is_in_kennel(pos_from, idx_player):
             return False
         if self.is_in_finish(pos_to, idx_player) and steps < 0:
             return False
-        if steps > 0:
-            forward_path = self.get_path_positions(pos_from, pos_to)
-            for ppos in forward_path[1:]:
-                occ = self.get_marble_at_pos(ppos)
-                if occ is not None:
-                    o_idx = self.get_marble_owner(ppos)
-                    om = self.get_marble_by_pos(o_idx, ppos)
-                    if ppos == o_idx * 16 and om.is_save:
-                        return False
-            occ = self.get_marble_at_pos(pos_to)
-            if occ is not None:
-                o_idx = self.get_marble_owner(pos_to)
-                if self.is_in_finish(pos_to, o_idx):
-                    return False
-        else:
-            backward_path = self.get_path_positions(pos_to, pos_from)
-            for ppos in backward_path[1:]:
-                occ = self.get_marble_at_pos(ppos)
-                if occ is not None:
-                    o_idx = self.get_marble_owner(ppos)
-                    om = self.get_marble_by_pos(o_idx, ppos)
-                    if ppos == o_idx * 16 and om.is_save:
-                        return False
-            occ = self.get_marble_at_pos(pos_to)
-            if occ is not None:
-                o_idx = self.get_marble_owner(pos_to)
-                if self.is_in_finish(pos_to, o_idx):
-                    return False
-        return True
+        _, path_mask = get_move_path(idx_player, pos_from, pos_to, steps)
+        if path_mask & self.get_blocking_mask():
+            return False
+        return not self.is_landing_blocked(pos_to)
 
     def send_marble_home(self, idx_player: int, pos: int):
         m = self.get_marble_by_pos(idx_player, pos)
         if m:
             kennel_start = 64 + idx_player * 8
-            m.pos = kennel_start
-            m.is_save = False
+            self.place_marble(idx_player, m, kennel_start, False)
 
     def apply_normal_move(self, action: Action):
         pos_from = action.pos_from
         pos_to = action.pos_to
+        if pos_from is None or pos_to is None:
+            return False
         idx = self.state.idx_player_active
-        p = self.state.list_player[idx]
-        mm = None
-        for m in p.list_marble:
-            if m.pos == pos_from:
-                mm = m
-                break
+        mm = self.get_marble_by_pos(idx, pos_from)
         if mm is None:
             return False
 
@@ -673,9 +1271,7 @@ class Dog(Game):
                 return False
             self.send_marble_home(o_idx, pos_to)
 
-        mm.pos = pos_to
-        if self.is_in_kennel(pos_from, idx):
-            mm.is_save = True
+        self.place_marble(idx, mm, pos_to, True if self.is_in_kennel(pos_from, idx) else None)
         return True
 
     def apply_j_swap(self, action: Action):
@@ -701,19 +1297,35 @@ class Dog(Game):
             return False
 
         p1_pos = m1.pos
-        m1.pos = m2.pos
-        m2.pos = p1_pos
+        self.place_marble(from_owner, m1, m2.pos)
+        self.place_marble(to_owner, m2, p1_pos)
         return True
 
-    def save_backup_state(self):
-        self.seven_backup_state = copy.deepcopy(self.state)
+    def save_backup_state(self) -> List[SevenStep]:
+        """ Start journaling the partial moves of a SEVEN """
+        self.seven_journal = []
+        self.seven_card_active = self.state.card_active
+        self.seven_steps_used = 0
+        return self.seven_journal
 
     def restore_backup_state(self):
-        if self.seven_backup_state:
-            self.state = self.seven_backup_state
-            self.seven_backup_state = None
+        """ Roll back all partial moves of the SEVEN in progress """
+        if self.seven_journal is None:
+            return
+        list_player = self.state.list_player
+        for step in reversed(self.seven_journal):
+            mm = list_player[step.idx_player].list_marble[step.idx_marble]
+            self.place_marble(step.idx_player, mm, step.pos_from, step.is_save_from)
+            for o_idx, o_marble, pos, is_save in reversed(step.sent_home):
+                om = list_player[o_idx].list_marble[o_marble]
+                self.place_marble(o_idx, om, pos, is_save)
+        self.state.card_active = self.seven_card_active
+        self.seven_journal = None
+        self.seven_steps_used = 0
 
     def apply_seven_step(self, action: Action):
+        if action.pos_from is None or action.pos_to is None:
+            return False
         steps = action.pos_to - action.pos_from
         if action.pos_to < 64 and action.pos_from < 64:
             steps = (action.pos_to - action.pos_from) % 64
@@ -725,17 +1337,18 @@ class Dog(Game):
         if not self.can_apply_7_step(action.pos_from, action.pos_to, idx):
             return False
 
-        p = self.state.list_player[idx]
-        mm = None
-        for m in p.list_marble:
-            if m.pos == action.pos_from:
-                mm = m
-                break
+        mm = self.get_marble_by_pos(idx, action.pos_from)
         if mm is None:
             return False
 
-        path = self.get_path_positions(action.pos_from, action.pos_to)
-        for pp in path[1:]:
+        journal = self.seven_journal
+        if journal is None:
+            journal = self.save_backup_state()
+        step = SevenStep(idx, self.get_marble_slot(idx, mm), action.pos_from, mm.is_save, steps, [])
+        journal.append(step)
+
+        path, _ = get_move_path(idx, action.pos_from, action.pos_to, steps)
+        for pp in path:
             occ = self.get_marble_at_pos(pp)
             if occ is not None:
                 o_idx = self.get_marble_owner(pp)
@@ -743,6 +1356,7 @@ class Dog(Game):
                 if pp == o_idx * 16 and om.is_save:
                     return False
                 if pp != action.pos_to:
+                    step.sent_home.append((o_idx, self.get_marble_slot(o_idx, om), pp, om.is_save))
                     self.send_marble_home(o_idx, pp)
 
         occ = self.get_marble_at_pos(action.pos_to)
@@ -750,42 +1364,32 @@ class Dog(Game):
             o_idx = self.get_marble_owner(action.pos_to)
             if self.is_in_finish(action.pos_to, o_idx):
                 return False
+            om = self.get_marble_by_pos(o_idx, action.pos_to)
+            step.sent_home.append(
+                (o_idx, self.get_marble_slot(o_idx, om), action.pos_to, om.is_save))
             self.send_marble_home(o_idx, action.pos_to)
 
-        mm.pos = action.pos_to
-        if self.is_in_kennel(action.pos_from, idx):
-            mm.is_save = True
+        is_save = True if self.is_in_kennel(action.pos_from, idx) else None
+        self.place_marble(idx, mm, action.pos_to, is_save)
+        self.seven_steps_used += steps
 
         used_steps = self.count_used_7_steps()
         if used_steps == 7:
             self.remove_card_from_hand(idx, action.card)
             self.discard_card(action.card)
-            self.seven_backup_state = None
+            self.seven_journal = None
+            self.seven_steps_used = 0
             self.state.card_active = None
             self.end_turn()
         else:
             # ensure card_active is set to '7'
-            self.state.card_active = Card(suit='♣', rank='7')
+            self.state.card_active = CARD_BY_CODE[CARD_CODE[('♣', '7')]]
         return True
 
     def count_used_7_steps(self):
-        if not self.seven_backup_state:
+        if self.seven_journal is None:
             return 0
-        old_p = self.seven_backup_state.list_player[self.state.idx_player_active]
-        new_p = self.state.list_player[self.state.idx_player_active]
-        old_pos = sorted([m.pos for m in old_p.list_marble])
-        new_pos = sorted([m.pos for m in new_p.list_marble])
-        steps_used = 0
-        for i in range(4):
-            op = old_pos[i]
-            np = new_pos[i]
-            if op < 64 and np < 64:
-                fw_steps = (np - op) % 64
-            else:
-                fw_steps = (np - op)
-            if fw_steps > 0:
-                steps_used += fw_steps
-        return steps_used
+        return self.seven_steps_used
 
     def can_apply_7_step(self, pos_from: int, pos_to: int, idx_player: int):
         steps = (pos_to - pos_from)
@@ -793,26 +1397,19 @@ class Dog(Game):
             steps = (pos_to - pos_from) % 64
         if steps <= 0:
             return False
-        path = self.get_path_positions(pos_from, pos_to)
-        for pp in path[1:]:
-            occ = self.get_marble_at_pos(pp)
-            if occ is not None:
-                o_idx = self.get_marble_owner(pp)
-                om = self.get_marble_by_pos(o_idx, pp)
-                if pp == o_idx * 16 and om.is_save:
-                    return False
-        occ = self.get_marble_at_pos(pos_to)
-        if occ is not None:
-            o_idx = self.get_marble_owner(pos_to)
-            if self.is_in_finish(pos_to, o_idx):
-                return False
-        return True
+        _, path_mask = get_move_path(idx_player, pos_from, pos_to, steps)
+        if path_mask & self.get_blocking_mask():
+            return False
+        return not self.is_landing_blocked(pos_to)
 
 
 class RandomPlayer(Player):
-    def select_action(self, state: GameState, actions: List[Action]) -> Optional[Action]:
+    def __init__(self, seed: Optional[int] = None) -> None:
+        self.rng = random.Random(seed)
+
+    def select_action(self, state: GameState, actions: Sequence[Action]) -> Optional[Action]:
         if actions:
-            return random.choice(actions)
+            return self.rng.choice(actions)
         return None
 
 
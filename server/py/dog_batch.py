@@ -0,0 +1,137 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import numpy.typing as npt
+from server.py.dog import (
+    Dog, Action, GameState, GamePhase, CARD_BY_CODE, STEPS_BY_RANK, IDX_STEPS, LIST_STEPS,
+    CNT_CELLS, CNT_PATH_CELLS, check_moves)
+
+
+# move table step indices of every card code, -1 where a card has fewer than two step options
+CARD_STEP_IDX = np.full((len(CARD_BY_CODE), 2), -1, dtype=np.int64)
+for code_card, card_card in enumerate(CARD_BY_CODE):
+    for k_step, steps_card in enumerate(STEPS_BY_RANK.get(card_card.rank, ())):
+        CARD_STEP_IDX[code_card, k_step] = IDX_STEPS[steps_card]
+
+
+class DogBatch:
+    """ Independent Dog games advanced in lockstep,
+    validating the normal moves of all games in one numpy call """
+
+    def __init__(self, cnt_games: int, seed: Optional[int] = None) -> None:
+        if cnt_games <= 0:
+            raise ValueError('cnt_games must be positive')
+        self.games = [Dog(seed=None if seed is None else seed + i) for i in range(cnt_games)]
+        # per game arrays (e.g. as observations for training), rebuilt on first access after a step
+        self.marble_pos = np.zeros((cnt_games, 4, 4), dtype=np.int16)
+        self.idx_player_active = np.zeros(cnt_games, dtype=np.int8)
+        self.cnt_round = np.zeros(cnt_games, dtype=np.int32)
+        self.is_finished = np.zeros(cnt_games, dtype=np.bool_)
+        self.arrays_version: Optional[List[int]] = None
+
+    def __len__(self) -> int:
+        return len(self.games)
+
+    def reset(self) -> None:
+        for game in self.games:
+            game.reset()
+
+    def get_state(self, idx_game: int) -> GameState:
+        return self.games[idx_game].get_state()
+
+    def get_player_view(self, idx_game: int, idx_player: int) -> GameState:
+        return self.games[idx_game].get_player_view(idx_player)
+
+    def get_list_running(self) -> List[int]:
+        return [i for i, game in enumerate(self.games) if game.state.phase != GamePhase.FINISHED]
+
+    def get_list_action(self) -> List[Sequence[Action]]:
+        """ Actions of the active player of every game (empty for finished games) """
+        self.prepare_normal_moves()
+        return [game.get_list_action() for game in self.games]
+
+    def apply_action(self, actions: Sequence[Optional[Action]]) -> None:
+        """ Apply one action (or None) per game; finished games are skipped """
+        if len(actions) != len(self.games):
+            raise ValueError(f'Expected {len(self.games)} actions, got {len(actions)}')
+        for game, action in zip(self.games, actions):
+            if game.state.phase != GamePhase.FINISHED:
+                game.apply_action(action)
+
+    def get_arrays(self) -> Tuple[npt.NDArray[np.int16], npt.NDArray[np.int8],
+                                  npt.NDArray[np.int32], npt.NDArray[np.bool_]]:
+        """ Marble positions (game, player, marble; -1 if missing),
+        active player, round and finished flag """
+        versions = [game.state_version for game in self.games]
+        if versions != self.arrays_version:
+            states = [game.state for game in self.games]
+            self.marble_pos.fill(-1)
+            for i, state in enumerate(states):
+                for p_idx, p in enumerate(state.list_player[:4]):
+                    positions = [mm.pos for mm in p.list_marble[:4]]
+                    self.marble_pos[i, p_idx, :len(positions)] = positions
+            self.idx_player_active[:] = [state.idx_player_active for state in states]
+            self.cnt_round[:] = [state.cnt_round for state in states]
+            self.is_finished[:] = [state.phase == GamePhase.FINISHED for state in states]
+            self.arrays_version = versions
+        return self.marble_pos, self.idx_player_active, self.cnt_round, self.is_finished
+
+    def prepare_normal_moves(self) -> None:
+        """ Compute the normal moves that the games' get_list_action would ask for,
+        all games at once """
+        pending: List[Tuple[Dog, int, List[int]]] = []
+        list_pos: List[int] = []
+        card_rows: List[int] = []
+        card_codes: List[int] = []
+        for game in self.games:
+            codes = game.get_uncached_normal_codes()
+            if not codes:
+                continue
+            state = game.state
+            idx_player = state.idx_player_active
+            positions = [mm.pos for p in state.list_player for mm in p.list_marble]
+            # anything but a regular board is left to the game itself
+            if len(positions) != 16 or any(len(p.list_marble) != 4 for p in state.list_player) \
+                    or min(positions) < 0 or max(positions) >= CNT_CELLS:
+                continue
+            card_rows.extend([len(pending)] * len(codes))
+            card_codes.extend(codes)
+            pending.append((game, idx_player, codes))
+            list_pos.extend(positions)
+        if not pending:
+            return
+
+        # (game, player, marble)
+        marbles = np.array(list_pos, dtype=np.int64).reshape(len(pending), 4, 4)
+        players = np.array([idx_player for _, idx_player, _ in pending], dtype=np.int64)
+        rows = np.array(card_rows, dtype=np.int64)
+        step_idx = CARD_STEP_IDX[card_codes]  # (card, step)
+        has_step = np.broadcast_to((step_idx >= 0)[:, None, :], (len(rows), 4, 2))
+        own = marbles[rows, players[rows]]  # (card, marble)
+        flat = ((players[rows, None, None] * CNT_CELLS + own[:, :, None]) * len(LIST_STEPS)
+                + np.maximum(step_idx, 0)[:, None, :])
+
+        masks = [game.get_blocking_mask() for game, _, _ in pending]
+        blocking = np.array([[mask & 0xFFFFFFFFFFFFFFFF, mask >> 64] for mask in masks],
+                            dtype=np.uint64)
+        # marbles in their own finish can't be landed on
+        finish_start = 68 + 8 * np.arange(4)[None, :, None]
+        in_finish = (marbles >= finish_start) & (marbles < finish_start + 4)
+        no_landing = np.zeros((len(pending), CNT_PATH_CELLS), dtype=np.bool_)
+        idx_game, idx_owner, idx_marble = np.nonzero(in_finish)
+        no_landing[idx_game, marbles[idx_game, idx_owner, idx_marble]] = True
+
+        dest, valid = check_moves(flat.ravel(), blocking, no_landing, np.repeat(rows, 8))
+        dest = dest.reshape(flat.shape)
+        valid = valid.reshape(flat.shape) & has_step
+
+        moves: List[Dict[int, List[Action]]] = [
+            {code: [] for code in codes} for _, _, codes in pending]
+        i_card, i_marble, i_step = np.nonzero(valid)
+        for i, pos_from, pos_to in zip(
+                i_card.tolist(), own[i_card, i_marble].tolist(),
+                dest[i_card, i_marble, i_step].tolist()):
+            code = card_codes[i]
+            moves[card_rows[i]][code].append(
+                Action(card=CARD_BY_CODE[code], pos_from=pos_from, pos_to=pos_to, card_swap=None))
+        for (game, idx_player, _), moves_game in zip(pending, moves):
+            game.store_normal_moves(idx_player, moves_game)
@@ -0,0 +1,292 @@
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+import math
+import random
+import time
+from server.py.game import Player, LazyActions, ActionList
+from server.py.dog import (
+    Dog, Action, Card, GamePhase, GameState, card_to_code, copy_state, get_action_key)
+
+
+ActionKey = Tuple[int, Optional[int], Optional[int], int]
+
+
+def get_marble_progress(idx_player: int, pos: int) -> int:
+    """ Squares a marble has covered: 0 in the kennel, 1..64 on the ring, 65..68 in the finish """
+    kennel_start = 64 + idx_player * 8
+    if pos >= 64:
+        return 0 if pos < kennel_start + 4 else 65 + pos - kennel_start - 4
+    return (pos - idx_player * 16) % 64 + 1
+
+
+def get_public_signature(state: GameState) -> Tuple[object, ...]:
+    """ Everything all players can see of a state:
+    marbles, turn, active card, discard pile and hand sizes """
+    return (
+        tuple((mm.pos, mm.is_save) for p in state.list_player for mm in p.list_marble),
+        tuple(len(p.list_card) for p in state.list_player),
+        state.phase, state.cnt_round, state.bool_card_exchanged, state.idx_player_active,
+        None if state.card_active is None else card_to_code(state.card_active),
+        len(state.list_card_discard))
+
+
+class MCTSNode:
+    """ Statistics of an action in the search tree,
+    shared by all sampled deals in which it is legal """
+
+    def __init__(self, action: Optional[Action], idx_player: int,
+                 signature: Optional[Tuple[object, ...]]) -> None:
+        self.action = action
+        self.idx_player = idx_player  # who played the action; value is counted for their team
+        self.signature = signature
+        self.children: Dict[Optional[ActionKey], 'MCTSNode'] = {}
+        self.cnt_visit = 0
+        self.cnt_avail = 0
+        self.value = 0.0
+
+
+class MCTSPlayer(Player):
+    """ Information set Monte Carlo tree search: every simulation deals the unseen cards at random,
+    descends the shared tree by UCB over the actions legal in that deal
+    and finishes with a short random rollout """
+
+    def __init__(self, seed: Optional[int] = None, time_limit: Optional[float] = 1.0,
+                 max_nodes: Optional[int] = None, rollout_depth: int = 24, exploration: float = 0.7,
+                 eval_scale: float = 40.0, reuse_depth: int = 8) -> None:
+        if time_limit is None and max_nodes is None:
+            raise ValueError('Either time_limit or max_nodes is needed')
+        self.rng = random.Random(seed)
+        self.time_limit = time_limit
+        self.max_nodes = max_nodes  # simulations per move, each expands at most one node
+        self.rollout_depth = rollout_depth
+        self.exploration = exploration
+        self.eval_scale = eval_scale
+        self.reuse_depth = reuse_depth
+        self.engine: Optional[Dog] = None
+        self.root: Optional[MCTSNode] = None
+        # the view doesn't show how much of our SEVEN is already played
+        self.seven_steps_used = 0
+        self.stats: Dict[str, float] = {}
+
+    def select_action(self, state: GameState, actions: Sequence[Action]) -> Optional[Action]:
+        if state.card_active is None or state.card_active.rank != '7':
+            self.seven_steps_used = 0
+        if not actions:
+            return None
+        if len(actions) == 1 or (state.cnt_round == 0 and not state.bool_card_exchanged):
+            action = actions[0] if len(actions) == 1 else self.rng.choice(actions)
+        else:
+            action = self.search(state, actions)
+        if action.card.rank == '7' and action.pos_from is not None and action.pos_to is not None:
+            steps = action.pos_to - action.pos_from
+            on_ring = action.pos_from < 64 and action.pos_to < 64
+            self.seven_steps_used += steps % 64 if on_ring else steps
+        return action
+
+    def search(self, state: GameState, actions: Sequence[Action]) -> Action:
+        root = self.grow_tree(state, actions)
+        keys = {get_action_key(a) for a in actions}
+        best = max((child for key, child in root.children.items() if key in keys),
+                   key=lambda child: child.cnt_visit)
+        self.root = best
+        return best.action if best.action is not None else actions[0]
+
+    def grow_tree(self, state: GameState, actions: Sequence[Action]) -> MCTSNode:
+        """ Run simulations from the view until the budget is used up;
+        the root's children hold the result """
+        time_start = time.perf_counter()
+        idx_me = state.idx_player_active
+        engine = self.get_engine(state)
+        signature = get_public_signature(state)
+        root = self.find_root(signature) or MCTSNode(None, idx_me, signature)
+        cnt_reused = root.cnt_visit
+
+        # cards we can't see: the deck minus our hand and the discard pile,
+        # dealt anew for every simulation
+        unseen = GameState.BASE_DECK.copy()
+        for c in state.list_player[idx_me].list_card + state.list_card_discard:
+            if c in unseen:
+                unseen.remove(c)
+
+        cnt_iter = 0
+        cnt_nodes = 0
+        deadline = None if self.time_limit is None else time_start + self.time_limit
+        while cnt_iter == 0 or (
+                (self.max_nodes is None or cnt_iter < self.max_nodes)
+                and (deadline is None or time.perf_counter() < deadline)):
+            cnt_batch = self.get_batch_size(
+                None if self.max_nodes is None else self.max_nodes - cnt_iter)
+            cnt_done, cnt_new = self.run_simulations(
+                root, lambda: engine.clone(self.determinize(state, idx_me, unseen), rng=self.rng),
+                actions, cnt_batch)
+            cnt_iter += cnt_done
+            cnt_nodes += cnt_new
+
+        duration = time.perf_counter() - time_start
+        self.stats = {
+            'iterations': cnt_iter, 'nodes': cnt_nodes, 'reused_visits': cnt_reused,
+            'duration': duration, 'iters_per_sec': cnt_iter / duration if duration > 0 else 0.0,
+            'nodes_per_sec': cnt_nodes / duration if duration > 0 else 0.0}
+        return root
+
+    def get_batch_size(self, cnt_left: Optional[int]) -> int:
+        """ Simulations to run before the time limit is checked again,
+        cnt_left of the budget remain (None: no limit) """
+        if self.time_limit is None and cnt_left is not None:
+            return max(1, cnt_left)
+        return 1
+
+    def run_simulations(self, root: MCTSNode, deal: Callable[[], Dog], actions: Sequence[Action],
+                        cnt_batch: int) -> Tuple[int, int]:
+        """ Simulate cnt_batch times on freshly sampled deals;
+        returns the simulations run and nodes added """
+        cnt_nodes = 0
+        for _ in range(cnt_batch):
+            sim = deal()
+            path, cnt_new = self.descend(root, sim, actions)
+            self.backpropagate(path, self.rollout(sim))
+            cnt_nodes += cnt_new
+        return cnt_batch, cnt_nodes
+
+    def get_engine(self, state: GameState) -> Dog:
+        """ Template engine with the turn context that the view doesn't carry """
+        if self.engine is None:
+            self.engine = Dog(seed=self.rng.randrange(1 << 32))
+        engine = self.engine
+        card_active = state.card_active
+        engine.joker_chosen = card_active is not None and card_active.rank not in ('7', 'JKR')
+        is_seven = card_active is not None and card_active.rank == '7'
+        engine.seven_journal = [] if is_seven else None
+        engine.seven_card_active = None
+        engine.seven_steps_used = self.seven_steps_used if is_seven else 0
+        engine.exchange_buffer = [None, None, None, None]
+        return engine
+
+    def determinize(self, state: GameState, idx_me: int, unseen: List[Card]) -> GameState:
+        """ Copy of the view with the hidden hands and the draw pile
+        sampled from the unseen cards """
+        sample = copy_state(state)
+        self.rng.shuffle(unseen)
+        cursor = 0
+        for i, p in enumerate(sample.list_player):
+            if i != idx_me:
+                cnt = len(p.list_card)
+                hand = unseen[cursor:cursor + cnt]
+                cursor += cnt
+                # jokers played as another card never reach the discard pile,
+                # so the pool can run short
+                hand.extend(self.rng.choice(GameState.BASE_DECK) for _ in range(cnt - len(hand)))
+                p.list_card = hand
+        sample.list_card_draw = unseen[cursor:cursor + len(sample.list_card_draw)]
+        return sample
+
+    def find_root(self, signature: Tuple[object, ...]) -> Optional[MCTSNode]:
+        """ Subtree of the last search that reached the current position
+        (searched breadth first) """
+        layer = [] if self.root is None else [self.root]
+        for _ in range(self.reuse_depth + 1):
+            matches = [node for node in layer if node.signature == signature]
+            if matches:
+                return max(matches, key=lambda node: node.cnt_visit)
+            layer = [child for node in layer for child in node.children.values()]
+        return None
+
+    def descend(self, root: MCTSNode, sim: Dog,
+                actions: Sequence[Action]) -> Tuple[List[MCTSNode], int]:
+        """ Play the tree policy on a sampled deal until a node is added;
+        returns the path and the nodes added """
+        path = [root]
+        node = root
+        legal = actions
+        cnt_new = 0
+        while sim.state.phase != GamePhase.FINISHED:
+            if node is not root:
+                legal = sim.get_list_action()
+            idx_player = sim.state.idx_player_active
+            available = self.get_available(node, legal)
+            for child in available:
+                child.cnt_avail += 1
+            if len(available) < max(len(legal), 1):
+                found, action = self.get_untried(node, legal)
+                if found:
+                    key = None if action is None else get_action_key(action)
+                    sim.apply_action(action)
+                    child = MCTSNode(action, idx_player, get_public_signature(sim.state))
+                    child.cnt_avail = 1
+                    node.children[key] = child
+                    path.append(child)
+                    cnt_new = 1
+                    break
+            if not available:
+                break
+            log_avail = {id(child): math.log(child.cnt_avail) for child in available}
+            node = max(available, key=lambda child: self.get_ucb(child, log_avail[id(child)]))
+            sim.apply_action(node.action)
+            path.append(node)
+        return path, cnt_new
+
+    def backpropagate(self, path: List[MCTSNode], reward: float, cnt_visit: int = 1) -> None:
+        """ Add the reward of team 0 to the path, seen from the team of each node's player """
+        for node in path:
+            node.cnt_visit += cnt_visit
+            node.value += reward if node.idx_player % 2 == 0 else 1.0 - reward
+
+    def get_ucb(self, node: MCTSNode, log_avail: float) -> float:
+        if node.cnt_visit == 0:
+            return math.inf
+        exploit = node.value / node.cnt_visit
+        return exploit + self.exploration * math.sqrt(log_avail / node.cnt_visit)
+
+    def get_available(self, node: MCTSNode, legal: Sequence[Action]) -> List[MCTSNode]:
+        """ Children whose action is legal in this deal
+        (None stands for folding when nothing is legal) """
+        if not node.children:
+            return []
+        if not legal:
+            child = node.children.get(None)
+            return [] if child is None else [child]
+        keys: Set[ActionKey] = set()
+        lazy: List[LazyActions[Action]] = []
+        segments = legal.segments if isinstance(legal, ActionList) else [legal]
+        for segment in segments:
+            if isinstance(segment, LazyActions):
+                lazy.append(segment)
+            else:
+                keys.update(get_action_key(a) for a in segment)
+        return [child for key, child in node.children.items()
+                if key in keys
+                or (key is not None and any(child.action in segment for segment in lazy))]
+
+    def get_untried(self, node: MCTSNode, legal: Sequence[Action]) -> Tuple[bool, Optional[Action]]:
+        """ A legal action without a child yet,
+        sampled so that long lazy lists (J swaps) stay unbuilt """
+        if not legal:
+            return None not in node.children, None
+        for _ in range(8):
+            action = legal[self.rng.randrange(len(legal))]
+            if get_action_key(action) not in node.children:
+                return True, action
+        if len(legal) <= 64:
+            for action in legal:
+                if get_action_key(action) not in node.children:
+                    return True, action
+        return False, None
+
+    def rollout(self, sim: Dog) -> float:
+        for _ in range(self.rollout_depth):
+            if sim.state.phase == GamePhase.FINISHED:
+                break
+            actions = sim.get_list_action()
+            sim.apply_action(self.rng.choice(actions) if actions else None)
+        return self.evaluate(sim)
+
+    def evaluate(self, sim: Dog) -> float:
+        """ Chance of team 0 (players 1 and 3) to win, estimated from how far the marbles got """
+        if sim.team_finished([0, 2]):
+            return 1.0
+        if sim.team_finished([1, 3]):
+            return 0.0
+        progress = [0, 0]
+        for p_idx, p in enumerate(sim.state.list_player):
+            for mm in p.list_marble:
+                progress[p_idx % 2] += get_marble_progress(p_idx, mm.pos)
+        return 1.0 / (1.0 + math.exp((progress[1] - progress[0]) / self.eval_scale))
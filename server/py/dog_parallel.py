@@ -0,0 +1,209 @@
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import math
+import os
+import struct
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from server.py.dog import (
+    Dog, Action, GameState, GamePhase, CompactState, copy_state, get_action_key)
+from server.py.dog_mcts import ActionKey, MCTSNode, MCTSPlayer
+
+
+SLOT_SIZE = 512  # a compact Dog state takes about 160 bytes
+SLOT_HEADER = struct.Struct('<HB')  # length of the compact state, steps of the SEVEN in progress
+
+
+class StateBuffers:
+    """ Fixed size slots in shared memory holding compact states, so a worker reads a position
+    from memory instead of unpickling a pydantic GameState for every task """
+
+    def __init__(self, cnt_slots: int, name: Optional[str] = None) -> None:
+        self.cnt_slots = cnt_slots
+        self.memory = SharedMemory(name=name, create=name is None, size=cnt_slots * SLOT_SIZE)
+        self.name = self.memory.name
+        buf = self.memory.buf
+        assert buf is not None
+        self.buf: memoryview = buf
+
+    def write(self, idx_slot: int, state: GameState, seven_steps_used: int = 0) -> None:
+        buffer = CompactState.from_game_state(state).buffer
+        if SLOT_HEADER.size + len(buffer) > SLOT_SIZE:
+            raise ValueError(f'State of {len(buffer)} bytes does not fit into a slot')
+        ofs = idx_slot * SLOT_SIZE
+        SLOT_HEADER.pack_into(self.buf, ofs, len(buffer), seven_steps_used)
+        ofs += SLOT_HEADER.size
+        self.buf[ofs:ofs + len(buffer)] = buffer
+
+    def read(self, idx_slot: int) -> Tuple[GameState, int]:
+        ofs = idx_slot * SLOT_SIZE
+        size, seven_steps_used = SLOT_HEADER.unpack_from(self.buf, ofs)
+        ofs += SLOT_HEADER.size
+        return CompactState(bytes(self.buf[ofs:ofs + size])).to_game_state(), seven_steps_used
+
+    def close(self) -> None:
+        self.memory.close()
+
+    def unlink(self) -> None:
+        self.memory.unlink()
+
+
+# per worker process: the parent's state buffers and one search per parent player
+# (to reuse its engine)
+worker_buffers: Optional[StateBuffers] = None
+worker_players: Dict[int, MCTSPlayer] = {}
+
+
+def init_worker(name: str, cnt_slots: int) -> None:
+    global worker_buffers  # pylint: disable = global-statement
+    worker_buffers = StateBuffers(cnt_slots, name)
+
+
+def get_worker_player(key_player: int, seed: int, options: Dict[str, Any]) -> MCTSPlayer:
+    """ Search of the parent player, reseeded so a task's result doesn't depend on the process """
+    player = worker_players.get(key_player)
+    if player is None:
+        player = worker_players[key_player] = MCTSPlayer(**options)
+        # made now, so creating it doesn't draw from the seeded rng of the first task only
+        player.engine = Dog()
+    player.rng.seed(seed)
+    return player
+
+
+def search_slot(idx_slot: int, key_player: int, seed: int,
+                options: Dict[str, Any]) -> Tuple[Dict[ActionKey, int], Dict[str, float]]:
+    """ Grow a new tree for the view in the slot;
+    returns the visits per root action and the stats """
+    assert worker_buffers is not None
+    state, seven_steps_used = worker_buffers.read(idx_slot)
+    player = get_worker_player(key_player, seed, options)
+    player.seven_steps_used = seven_steps_used
+    actions = player.get_engine(state).clone(copy_state(state), rng=player.rng).get_list_action()
+    # a fresh tree per task: a process can get several tasks of the same move,
+    # the merged trees must be independent
+    player.root = None
+    root = player.grow_tree(state, actions)
+    visits = {key: child.cnt_visit for key, child in root.children.items() if key is not None}
+    return visits, player.stats
+
+
+def rollout_slots(slots: List[int], key_player: int, seed: int,
+                  options: Dict[str, Any]) -> List[float]:
+    """ Rewards of team 0 after a random rollout from each of the sampled positions in the slots """
+    assert worker_buffers is not None
+    player = get_worker_player(key_player, seed, options)
+    rewards = []
+    for idx_slot in slots:
+        state, seven_steps_used = worker_buffers.read(idx_slot)
+        player.seven_steps_used = seven_steps_used
+        rewards.append(player.rollout(player.get_engine(state).clone(state, rng=player.rng)))
+    return rewards
+
+
+class ParallelMCTSPlayer(MCTSPlayer):
+    """ MCTSPlayer searching on a pool of worker processes
+
+    mode 'root': every worker grows its own tree from the view, the root visits are summed.
+    mode 'leaf': one tree in this process, the rollouts of a batch of leaves run on the workers
+    (virtual losses spread the batch over the tree). Positions are passed through shared memory.
+    Call close() (or use the player as a context manager) to stop the workers.
+    """
+
+    def __init__(self, cnt_workers: Optional[int] = None, mode: str = 'root',
+                 batch_size: Optional[int] = None, seed: Optional[int] = None,
+                 time_limit: Optional[float] = 1.0, max_nodes: Optional[int] = None,
+                 rollout_depth: int = 24, exploration: float = 0.7, eval_scale: float = 40.0,
+                 reuse_depth: int = 8) -> None:
+        if mode not in ('root', 'leaf'):
+            raise ValueError(f"Unknown mode '{mode}', expected 'root' or 'leaf'")
+        super().__init__(seed=seed, time_limit=time_limit, max_nodes=max_nodes,
+                         rollout_depth=rollout_depth, exploration=exploration,
+                         eval_scale=eval_scale, reuse_depth=reuse_depth)
+        self.cnt_workers = cnt_workers or os.cpu_count() or 1
+        self.mode = mode
+        self.batch_size = batch_size or 4 * self.cnt_workers
+        self.options: Dict[str, Any] = {
+            'rollout_depth': rollout_depth, 'exploration': exploration,
+            'eval_scale': eval_scale, 'reuse_depth': reuse_depth}
+        self.buffers = StateBuffers(max(self.batch_size, 1))
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.cnt_workers, initializer=init_worker,
+            initargs=(self.buffers.name, self.buffers.cnt_slots))
+
+    def close(self) -> None:
+        self.executor.shutdown()
+        self.buffers.close()
+        self.buffers.unlink()
+
+    def __enter__(self) -> 'ParallelMCTSPlayer':
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def search(self, state: GameState, actions: Sequence[Action]) -> Action:
+        if self.mode == 'leaf':
+            return super().search(state, actions)
+        time_start = time.perf_counter()
+        self.buffers.write(0, state, self.seven_steps_used)
+        max_nodes = None if self.max_nodes is None else math.ceil(self.max_nodes / self.cnt_workers)
+        options = dict(self.options, time_limit=self.time_limit, max_nodes=max_nodes)
+        futures = [
+            self.executor.submit(search_slot, 0, id(self), self.rng.randrange(1 << 32), options)
+            for _ in range(self.cnt_workers)]
+
+        visits: Dict[ActionKey, int] = {}
+        cnt_iter = 0
+        cnt_nodes = 0
+        for future in futures:
+            visits_worker, stats = future.result()
+            for key, cnt in visits_worker.items():
+                visits[key] = visits.get(key, 0) + cnt
+            cnt_iter += int(stats['iterations'])
+            cnt_nodes += int(stats['nodes'])
+        duration = time.perf_counter() - time_start
+        self.stats = {
+            'iterations': cnt_iter, 'nodes': cnt_nodes, 'reused_visits': 0,
+            'root_visits': sum(visits.values()), 'duration': duration,
+            'iters_per_sec': cnt_iter / duration if duration > 0 else 0.0,
+            'nodes_per_sec': cnt_nodes / duration if duration > 0 else 0.0}
+        return max(actions, key=lambda a: visits.get(get_action_key(a), 0))
+
+    def get_batch_size(self, cnt_left: Optional[int]) -> int:
+        return self.batch_size if cnt_left is None else max(1, min(self.batch_size, cnt_left))
+
+    def run_simulations(self, root: MCTSNode, deal: Callable[[], Dog], actions: Sequence[Action],
+                        cnt_batch: int) -> Tuple[int, int]:
+        pending: List[Tuple[List[MCTSNode], int]] = []
+        finished: List[Tuple[List[MCTSNode], float]] = []
+        cnt_nodes = 0
+        for _ in range(cnt_batch):
+            sim = deal()
+            path, cnt_new = self.descend(root, sim, actions)
+            cnt_nodes += cnt_new
+            if sim.state.phase == GamePhase.FINISHED:
+                finished.append((path, self.evaluate(sim)))
+                continue
+            # virtual loss: count the visit now,
+            # so the next descents of the batch prefer other paths
+            for node in path:
+                node.cnt_visit += 1
+            seven_steps_used = sim.seven_steps_used if sim.seven_journal is not None else 0
+            self.buffers.write(len(pending), sim.state, seven_steps_used)
+            pending.append((path, len(pending)))
+
+        slots = [idx_slot for _, idx_slot in pending]
+        chunks = [slots[k::self.cnt_workers] for k in range(min(self.cnt_workers, len(slots)))]
+        futures = [
+            self.executor.submit(
+                rollout_slots, chunk, id(self), self.rng.randrange(1 << 32), self.options)
+            for chunk in chunks]
+        rewards: Dict[int, float] = {}
+        for chunk, future in zip(chunks, futures):
+            rewards.update(zip(chunk, future.result()))
+
+        for path, idx_slot in pending:
+            self.backpropagate(path, rewards[idx_slot], cnt_visit=0)
+        for path, reward in finished:
+            self.backpropagate(path, reward)
+        return cnt_batch, cnt_nodes
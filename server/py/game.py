@@ -1,9 +1,72 @@
-from typing import List, Any
+from typing import List, Any, Sequence, Iterable, Iterator, TypeVar, Union, overload
 from abc import ABCMeta, abstractmethod
+from bisect import bisect_right
+from itertools import accumulate
 
 GameState = Any
 GameAction = Any
 
+T = TypeVar('T')
+
+
+class LazyActions(Sequence[T]):
+    """ Read-only sequence of actions that are only built when accessed """
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def get_action(self, index: int) -> T:
+        """ Build the action at a valid, non-negative index """
+        pass
+
+    @overload
+    def __getitem__(self, index: int) -> T: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[T]: ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[T, List[T]]:
+        if isinstance(index, slice):
+            return [self.get_action(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('action index out of range')
+        return self.get_action(index)
+
+    def __iter__(self) -> Iterator[T]:
+        for i in range(len(self)):
+            yield self.get_action(i)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (list, tuple, Sequence)):
+            return list(self) == list(other)
+        return NotImplemented
+
+
+class ActionList(LazyActions[T]):
+    """ Concatenation of action sequences, e.g. plain lists and LazyActions """
+
+    def __init__(self, segments: Iterable[Sequence[T]] = ()) -> None:
+        self.segments = [segment for segment in segments if len(segment) > 0]
+        self.offsets = list(accumulate(len(segment) for segment in self.segments))
+
+    def __len__(self) -> int:
+        return self.offsets[-1] if self.offsets else 0
+
+    def get_action(self, index: int) -> T:
+        i = bisect_right(self.offsets, index)
+        return self.segments[i][index - (self.offsets[i - 1] if i > 0 else 0)]
+
+    def __iter__(self) -> Iterator[T]:
+        for segment in self.segments:
+            yield from segment
+
+    def __contains__(self, value: object) -> bool:
+        return any(value in segment for segment in self.segments)
+
 
 class Game(metaclass=ABCMeta):
 
@@ -23,7 +86,7 @@ class Game(metaclass=ABCMeta):
         pass
 
     @abstractmethod
-    def get_list_action(self) -> List[GameAction]:
+    def get_list_action(self) -> Sequence[GameAction]:
         """ Get a list of possible actions for the active player """
         pass
 
@@ -41,6 +104,6 @@ class Game(metaclass=ABCMeta):
 class Player(metaclass=ABCMeta):
 
     @abstractmethod
-    def select_action(self, state: GameState, actions: List[GameAction]) -> GameAction:
+    def select_action(self, state: GameState, actions: Sequence[GameAction]) -> GameAction:
         """ Given masked game state and possible actions, select the next action """
         pass
@@ -1,7 +1,7 @@
 # Example solution to test docker thingies
 
 
-from typing import List, Optional
+from typing import List, Optional, Sequence
 import string
 import random
 from enum import Enum
@@ -125,7 +125,7 @@ class Hangman(Game):
 # pylint: disable = too-few-public-methods
 class RandomPlayer(Player):
 
-    def select_action(self, state: HangmanGameState, actions: List[GuessLetterAction]) -> Optional[GuessLetterAction]:
+    def select_action(self, state: HangmanGameState, actions: Sequence[GuessLetterAction]) -> Optional[GuessLetterAction]:
         if len(actions) > 0:
             return random.choice(actions)
         return None
@@ -135,7 +135,7 @@ class RandomPlayer(Player):
 class StructuredPlayer(Player):
     perfect_order = [*'ESIARNTOLCDUPMGHBYFVKWZXQJ']
 
-    def select_action(self, state: HangmanGameState, actions: List[GuessLetterAction]) -> GuessLetterAction:
+    def select_action(self, state: HangmanGameState, actions: Sequence[GuessLetterAction]) -> GuessLetterAction:
         if len(actions) == 0:
             raise ValueError("Empty action list")
         available_letters = [action.letter for action in actions]
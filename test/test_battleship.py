@@ -0,0 +1,127 @@
+import itertools
+import random
+from typing import Dict, List, Sequence, Set
+
+import numpy as np
+
+from server.py.battleship import (
+    Battleship, BattleshipAction, ActionType, GamePhase, count_fleet_layouts, get_cell_index,
+    get_placement_matrix, get_placements, sample_fleets)
+
+
+def get_sunk_names(ships: Dict[str, List[str]], shots: Set[str]) -> List[str]:
+    """ Ships with every cell shot at, by the plain rules on location strings """
+    return [name for name, location in ships.items() if all(cell in shots for cell in location)]
+
+
+def test_replay_matches_plain_rules() -> None:
+    for seed in range(30):
+        random.seed(seed)
+        rng = random.Random(seed)
+        board_size = [10, 6, 12][seed % 3]
+        game = Battleship(board_size=board_size)
+        ships: List[Dict[str, List[str]]] = [{}, {}]
+        shots: List[Set[str]] = [set(), set()]
+        hits: List[List[str]] = [[], []]
+        while game.get_state().phase != GamePhase.FINISHED:
+            state = game.get_state()
+            idx = state.idx_player_active
+            action = rng.choice(game.get_list_action())
+            game.apply_action(action)
+            if action.action_type == ActionType.SET_SHIP:
+                assert action.ship_name is not None
+                ships[idx][action.ship_name] = action.location
+                continue
+            cell = action.location[0]
+            shots[idx].add(cell)
+            if any(cell in location for location in ships[1 - idx].values()):
+                hits[idx].append(cell)
+            assert state.players[idx].successful_shots == hits[idx]
+            for idx_view in (0, 1):
+                view = game.get_player_view(idx_view)
+                sunk = [ship.name for ship in view.players[1 - idx_view].ships]
+                assert sunk == get_sunk_names(ships[1 - idx_view], shots[idx_view])
+            fleet_cells = {c for location in ships[1 - idx].values() for c in location}
+            assert (state.phase == GamePhase.FINISHED) == fleet_cells.issubset(shots[idx])
+        assert game.get_state().winner == game.get_state().idx_player_active
+
+
+def shoot(game: Battleship, cell: str) -> None:
+    game.apply_action(BattleshipAction(action_type=ActionType.SHOOT, location=[cell]))
+
+
+def test_repeated_shots_dont_sink_a_ship() -> None:
+    game = Battleship(board_size=5, fleet=(('destroyer', 2), ('submarine', 3)))
+    game.get_state().idx_player_active = 0
+    for location in (['A1', 'A2'], ['E1', 'E2'], ['C1', 'C2', 'C3'], ['E3', 'E4', 'E5']):
+        name = 'destroyer' if len(location) == 2 else 'submarine'
+        game.apply_action(BattleshipAction(
+            action_type=ActionType.SET_SHIP, ship_name=name, location=location))
+    assert game.get_state().phase == GamePhase.RUNNING
+
+    # player 1 shoots the same hit again and again, player 2 keeps missing
+    for cell in ('E1', 'E1', 'E1'):
+        shoot(game, cell)
+        shoot(game, 'B5')
+        assert game.get_player_view(0).players[1].ships == []
+    shoot(game, 'E2')
+    assert [ship.name for ship in game.get_player_view(0).players[1].ships] == ['destroyer']
+    shoot(game, 'B5')
+    for cell in ('E3', 'E3', 'E4'):
+        shoot(game, cell)
+        shoot(game, 'B5')
+        assert [ship.name for ship in game.get_player_view(0).players[1].ships] == ['destroyer']
+    shoot(game, 'E5')
+    assert game.get_state().phase == GamePhase.FINISHED
+    assert game.get_state().winner == 0
+    sunk = [ship.name for ship in game.get_player_view(0).players[1].ships]
+    assert sunk == ['destroyer', 'submarine']
+
+
+def test_placement_matrix_rows_match_get_placements() -> None:
+    for board_size in (1, 4, 7, 10):
+        for length in range(1, board_size + 1):
+            placements = get_placements(length, board_size)
+            matrix = get_placement_matrix(length, board_size)
+            assert matrix.shape == (len(placements.masks), board_size * board_size)
+            for row, mask, location in zip(matrix, placements.masks, placements.locations):
+                assert np.flatnonzero(row).tolist() == [k for k in range(row.size) if mask >> k & 1]
+                assert sorted(get_cell_index(cell, board_size) for cell in location) \
+                    == np.flatnonzero(row).tolist()
+
+
+def count_layouts_brute_force(lengths: Sequence[int], board_size: int, busy: int) -> int:
+    tables = [get_placements(length, board_size).masks for length in lengths]
+    cnt = 0
+    for masks in itertools.product(*tables):
+        union = 0
+        for mask in masks:
+            if mask & (union | busy):
+                break
+            union |= mask
+        else:
+            cnt += 1
+    return cnt
+
+
+def test_count_fleet_layouts_matches_brute_force() -> None:
+    cases = [
+        ([2], 3, 0), ([3, 2], 4, 0), ([2, 2, 2], 4, 0), ([3, 2, 2], 5, 0),
+        ([2, 3], 4, 0b1000010001), ([4, 3, 2, 2], 5, 1 << 12), ([3, 3], 3, 0), ([3, 3, 3, 3], 3, 0)]
+    for lengths, board_size, busy in cases:
+        expected = count_layouts_brute_force(lengths, board_size, busy)
+        assert count_fleet_layouts(lengths, board_size, busy) == expected
+        assert count_fleet_layouts(lengths, board_size, busy, chunk_size=3) == expected
+
+
+def test_sample_fleets_gives_valid_layouts() -> None:
+    lengths = [3, 2, 2]
+    busy = 1 << 6
+    fleets = sample_fleets(lengths, 200, np.random.default_rng(0), board_size=5, busy=busy)
+    assert fleets.shape == (200, 3)
+    for fleet in fleets.tolist():
+        masks = [get_placements(length, 5).masks[k] for length, k in zip(lengths, fleet)]
+        union = busy
+        for mask in masks:
+            assert mask & union == 0
+            union |= mask
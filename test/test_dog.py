@@ -0,0 +1,53 @@
+from typing import Dict, List, Tuple
+
+from server.py.dog import Dog, RandomPlayer, GamePhase, CompactState, copy_state
+
+
+def get_expected_index(game: Dog) -> Dict[int, List[Tuple[int, int]]]:
+    """ Marbles by position (owner and object id), built from the state """
+    index: Dict[int, List[Tuple[int, int]]] = {}
+    for p_idx, p in enumerate(game.state.list_player):
+        for mm in p.list_marble:
+            index.setdefault(mm.pos, []).append((p_idx, id(mm)))
+    return index
+
+
+def get_fresh_hash(game: Dog) -> int:
+    """ Hash of the same position computed from scratch by another engine """
+    fresh = Dog(seed=0)
+    fresh.set_state(copy_state(game.state))
+    fresh.joker_chosen = game.joker_chosen
+    fresh.seven_steps_used = game.seven_steps_used
+    fresh.exchange_buffer = game.exchange_buffer.copy()
+    return fresh.get_hash()
+
+
+def test_incremental_structures_follow_random_games() -> None:
+    for seed in range(12):
+        game = Dog(seed=seed)
+        player = RandomPlayer(seed=seed)
+        if seed % 2 == 1:
+            # start before the card exchange, which a new game skips
+            state = game.get_state()
+            state.cnt_round = 0
+            game.set_state(state)
+        for _ in range(600):
+            state = game.get_state()
+            if state.phase == GamePhase.FINISHED:
+                break
+            actions = game.get_list_action()
+            view = game.get_player_view(state.idx_player_active)
+            game.apply_action(player.select_action(view, actions))
+
+            index = {pos: sorted((p_idx, id(mm)) for p_idx, mm in entries)
+                     for pos, entries in game.marble_index.items() if entries}
+            expected = get_expected_index(game)
+            assert index == {pos: sorted(entries) for pos, entries in expected.items()}
+            assert game.board_hash == game.compute_board_hash()
+            assert game.hand_hash == game.compute_hand_hash()
+            assert game.get_hash() == get_fresh_hash(game)
+
+            compact = game.get_compact_state()
+            assert compact.to_game_state().model_dump() == game.state.model_dump()
+            assert CompactState(compact.buffer).to_game_state() == game.state
+
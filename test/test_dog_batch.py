@@ -0,0 +1,41 @@
+import random
+
+from server.py.dog import Dog, GamePhase
+from server.py.dog_batch import DogBatch
+
+
+def test_batch_replays_like_single_games() -> None:
+    """ Games advanced by DogBatch take the same course
+    as Dog games with the same seeds played one by one """
+    cnt_games = 16
+    batch = DogBatch(cnt_games, seed=100)
+    games = [Dog(seed=100 + i) for i in range(cnt_games)]
+    rngs = [random.Random(i) for i in range(cnt_games)]
+    for _ in range(400):
+        lists_batch = batch.get_list_action()
+        chosen = []
+        for i, game in enumerate(games):
+            actions = game.get_list_action()
+            assert list(lists_batch[i]) == list(actions)
+            action = rngs[i].choice(actions) if len(actions) > 0 else None
+            if game.state.phase != GamePhase.FINISHED:
+                game.apply_action(action)
+            chosen.append(action)
+        batch.apply_action(chosen)
+        for i, game in enumerate(games):
+            assert batch.get_state(i) == game.get_state()
+
+
+def test_arrays_follow_the_games() -> None:
+    batch = DogBatch(4, seed=7)
+    for _ in range(50):
+        batch.apply_action(
+            [actions[0] if len(actions) > 0 else None for actions in batch.get_list_action()])
+    marble_pos, idx_player_active, cnt_round, is_finished = batch.get_arrays()
+    for i in range(len(batch)):
+        state = batch.get_state(i)
+        expected = [[mm.pos for mm in p.list_marble] for p in state.list_player]
+        assert marble_pos[i].tolist() == expected
+        assert idx_player_active[i] == state.idx_player_active
+        assert cnt_round[i] == state.cnt_round
+        assert is_finished[i] == (state.phase == GamePhase.FINISHED)
@@ -0,0 +1,51 @@
+from server.py.dog import Dog, RandomPlayer, get_action_key
+from server.py.dog_mcts import MCTSPlayer
+
+
+def advance_to_choice(game: Dog, player: RandomPlayer) -> None:
+    """ Play random moves until the exchange is done and the active player has a choice """
+    while True:
+        state = game.get_state()
+        actions = game.get_list_action()
+        if len(actions) > 1 and (state.cnt_round > 0 or state.bool_card_exchanged):
+            return
+        view = game.get_player_view(state.idx_player_active)
+        game.apply_action(player.select_action(view, actions))
+
+
+def test_select_action_returns_legal_action() -> None:
+    game = Dog(seed=2)
+    player = RandomPlayer(seed=2)
+    mcts = MCTSPlayer(seed=0, time_limit=None, max_nodes=30)
+    for _ in range(5):
+        advance_to_choice(game, player)
+        state = game.get_state()
+        actions = game.get_list_action()
+        action = mcts.select_action(game.get_player_view(state.idx_player_active), actions)
+        assert action is not None
+        assert get_action_key(action) in {get_action_key(a) for a in actions}
+        assert mcts.stats['iterations'] == 30
+        assert mcts.stats['nodes'] <= 30
+        assert mcts.root is not None and mcts.root.action == action
+        game.apply_action(action)
+
+
+def test_tree_is_reused_on_next_turn() -> None:
+    game = Dog(seed=3)
+    player = RandomPlayer(seed=3)
+    mcts = MCTSPlayer(seed=0, time_limit=None, max_nodes=60)
+    advance_to_choice(game, player)
+    state = game.get_state()
+    view = game.get_player_view(state.idx_player_active)
+    action = mcts.select_action(view, game.get_list_action())
+    assert mcts.stats['reused_visits'] == 0
+    assert mcts.root is not None
+    cnt_visit = mcts.root.cnt_visit
+    game.apply_action(action)
+
+    # the position after our move is the chosen child, so its visits carry over
+    state = game.get_state()
+    actions = game.get_list_action()
+    assert len(actions) > 1
+    mcts.select_action(game.get_player_view(state.idx_player_active), actions)
+    assert mcts.stats['reused_visits'] == cnt_visit > 0
@@ -0,0 +1,88 @@
+import random
+from typing import List, Tuple
+
+from server.py.dog import Dog, RandomPlayer, copy_state
+from server.py.dog_mcts import MCTSNode
+from server.py.dog_parallel import ParallelMCTSPlayer, StateBuffers
+
+
+def advance_to_choice(game: Dog, player: RandomPlayer) -> None:
+    """ Play random moves until the exchange is done and the active player has a choice """
+    while True:
+        state = game.get_state()
+        actions = game.get_list_action()
+        if len(actions) > 1 and (state.cnt_round > 0 or state.bool_card_exchanged):
+            return
+        view = game.get_player_view(state.idx_player_active)
+        game.apply_action(player.select_action(view, actions))
+
+
+def test_root_mode_merges_independent_trees() -> None:
+    game = Dog(seed=1)
+    player = RandomPlayer(seed=1)
+    # more tasks than workers over several moves:
+    # a process picking up a second task must not reuse its tree
+    with ParallelMCTSPlayer(cnt_workers=2, mode='root', seed=0, time_limit=None,
+                            max_nodes=40) as mcts:
+        for _ in range(3):
+            advance_to_choice(game, player)
+            state = game.get_state()
+            actions = game.get_list_action()
+            for _ in range(2):
+                mcts.search(game.get_player_view(state.idx_player_active), actions)
+                assert mcts.stats['root_visits'] == mcts.cnt_workers * 20
+                assert mcts.stats['iterations'] == mcts.cnt_workers * 20
+            view = game.get_player_view(state.idx_player_active)
+            game.apply_action(player.select_action(view, actions))
+
+
+def get_tree(node: MCTSNode) -> List[Tuple[int, float, list]]:
+    """ Visits, value and subtree of every child, in insertion order """
+    return [(child.cnt_visit, child.value, get_tree(child)) for child in node.children.values()]
+
+
+def test_leaf_mode_is_reproducible_with_reused_slots() -> None:
+    game = Dog(seed=2)
+    player = RandomPlayer(seed=2)
+    # 3 slots for 25 simulations: the rollouts of every batch overwrite the slots of the last one
+    with ParallelMCTSPlayer(cnt_workers=2, mode='leaf', batch_size=3, seed=0, time_limit=None,
+                            max_nodes=25) as mcts:
+        for _ in range(2):
+            advance_to_choice(game, player)
+            state = game.get_state()
+            view = game.get_player_view(state.idx_player_active)
+            actions = game.get_list_action()
+            trees = []
+            mcts.get_engine(view)  # creating the engine draws from the rng once
+            for _ in range(2):
+                # the same seed must give the same tree, whichever process runs a rollout
+                mcts.rng = random.Random(7)
+                mcts.root = None
+                root = mcts.grow_tree(view, actions)
+                assert mcts.stats['iterations'] == 25
+                assert root.cnt_visit == 25
+                assert all(0.0 <= child.value <= child.cnt_visit
+                           for child in root.children.values())
+                trees.append(get_tree(root))
+            assert trees[0] == trees[1]
+            game.apply_action(mcts.select_action(view, actions))
+
+
+def test_state_buffers_reuse_slots() -> None:
+    game = Dog(seed=3)
+    player = RandomPlayer(seed=3)
+    buffers = StateBuffers(2)
+    try:
+        first = copy_state(game.get_state())
+        buffers.write(1, first, 3)
+        for _ in range(40):
+            state = game.get_state()
+            actions = game.get_list_action()
+            view = game.get_player_view(state.idx_player_active)
+            game.apply_action(player.select_action(view, actions))
+            buffers.write(0, game.get_state(), 0)
+            assert buffers.read(0) == (game.get_state(), 0)
+        assert buffers.read(1) == (first, 3)
+    finally:
+        buffers.close()
+        buffers.unlink()